@@ -6,6 +6,10 @@ from SRC.Services.TimeConstraintsService import TimeConstraintsService
 from SRC.Controller.ManualScheduleController import ManualScheduleController
 from SRC.Services.ExcelExportManager import ExcelExportManager
 from SRC.DataBase.DataBaseManager import DatabaseManager 
+from SRC.DataBase.ScheduleCacheManager import ScheduleCacheManager
+from SRC.Models.ScheduleCursor import ScheduleCursor
+import asyncio
+import os
 
 class FileController:
     def __init__(self, file_type: str, filePath: str = None, use_database: bool = True):
@@ -25,6 +29,9 @@ class FileController:
             raise ValueError("Unsupported file type. Use 'excel' or 'txt'.")
         self.time_constraints_service = TimeConstraintsService()
         self._injected_constraints = []
+        self._time_constraints = []  # the constraints the dummy courses were made from
+        self._forbidden_mask = 0  # the constraints compiled into forbidden slots for the search
+        self.schedule_cache = ScheduleCacheManager()  # timetables of recently used selections
         self.manual_controller = None  # Initialize manual controller to None
 
     def get_file_type(self) -> str:
@@ -111,63 +118,224 @@ class FileController:
         """Returns the dynamic schedule based on the selected courses info."""
         return self.manual_service.get_dynamic_schedule() if self.manual_service else None
         
-    def get_all_options(self, file_path1, file_path2, batch_size=100):
+    def get_all_options(self, file_path1, file_path2, batch_size=100, workers=None, collapse_equivalent=False,
+                        resume_cursor=None, use_cache=True, min_difference=None, courses=None):
         """
         Returns batches of timetables instead of individual timetables
         This replaces the old method that returned individual timetables
         **שומר על הפרמטרים המקוריים בדיוק**
+        workers > 1 searches the timetables in that many processes (same order as a single process).
+        collapse_equivalent=True returns one timetable per time layout, with the interchangeable groups in its alternatives.
+        resume_cursor (see create_schedule_cursor) continues a previous run right after the timetable it points to.
+        use_cache=True returns the timetables of a selection that was already searched from the schedule cache
+        (same course codes, time constraints and catalog), and only searches for the ones that were not stored.
+        min_difference returns only timetables that differ from all the earlier ones by at least that many lessons
+        (a diverse subset to browse - not cached).
+        courses are the selected courses when they were already loaded (see load_selection).
         """
 
         # courses_info = self.read_courses_from_file(file_path1)[0]  # Get the first element which is the courses info
         # selected_courses = self.get_selected_courses(file_path2)
         # selected_courses_info = self.selected_courses_info(courses_info, selected_courses)
 
-        # אם יש דאטהבייס ולא נשלח file_path1, נשתמש בדאטהבייס
-        if self.use_database and file_path1 is None:
-            courses_info = self.get_courses_from_database()
-        else:
-            # אם נשלח file_path1 או שאין דאטהבייס, נשתמש בקובץ
-            if file_path1 is None:
-                raise ValueError("file_path1 is required when not using database")
-            courses_info = self.read_courses_from_file(file_path1)[0]  # Get the first element which is the courses info
-        
-        selected_courses = self.get_selected_courses(file_path2)
-        selected_courses_info = self.selected_courses_info(courses_info, selected_courses)
-
-        
-        # # Include dummy blocked courses if added earlier
-        # if hasattr(self, "_injected_constraints"):
-        #     selected_courses_info.extend(self._injected_constraints)
-        selected_courses_info = self.get_selected_courses_info(file_path1, file_path2)
+        # The selection is loaded once (unless the caller already loaded it, see load_selection)
+        if courses is None:
+            courses = self.load_selection(file_path1, file_path2)
+        selected_courses_info = courses
+        selected_courses = [course.code for course in courses]
 
         try:
             schedule_service = ScheduleService()
-            
+
+            # Return the cached timetables first, then search only for the rest
+            cache_key = None
+            fingerprint = ""
+            entries = []
+            if use_cache and resume_cursor is None and not min_difference:
+                cache_key = self._get_schedule_cache_key(file_path1, selected_courses, collapse_equivalent)
+                cached = self.schedule_cache.get(cache_key)
+                if cached is not None:
+                    try:
+                        restored = list(schedule_service.restore_schedules(
+                            selected_courses_info, cached['entries'], cached['fingerprint'], collapse_equivalent,
+                            self._forbidden_mask
+                        ))
+                    except ValueError:
+                        restored = []  # The courses changed without a new catalog revision - search again
+                    for start in range(0, len(restored), batch_size):
+                        yield restored[start:start + batch_size]
+                    if restored:
+                        if cached['complete']:
+                            return
+                        fingerprint = cached['fingerprint']
+                        entries = cached['entries']
+                        resume_cursor = schedule_service.create_cursor(restored[-1], count=len(restored))
+
             # Get the progressive generator (no limit)
             schedule_generator = schedule_service.generate_schedules_progressive(
                 selected_courses_info,  
-                limit=None # No limit, to get all possible schedules
+                limit=None, # No limit, to get all possible schedules
+                workers=workers,
+                collapse_equivalent=collapse_equivalent,
+                resume_cursor=resume_cursor,
+                forbidden_mask=self._forbidden_mask,
+                min_difference=min_difference
             )
-            
-            # Collect into batches
-            batch = []
-            for timetable in schedule_generator:
-                batch.append(timetable)
-                
-                # When batch is full, yield it
-                if len(batch) >= batch_size:
+
+            finished = False
+            truncated = False
+            try:
+                # Collect into batches
+                batch = []
+                for timetable in schedule_generator:
+                    batch.append(timetable)
+                    if cache_key is not None:
+                        fingerprint = timetable.search_space.fingerprint
+                        if len(entries) < self.schedule_cache.max_timetables:
+                            entries.append(schedule_service.encode_timetable(timetable))
+                        else:
+                            truncated = True
+
+                    # When batch is full, yield it
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []  # Reset for next batch
+
+                # Yield final batch if it has any items
+                if batch:
                     yield batch
-                    batch = []  # Reset for next batch
-                    
-            # Yield final batch if it has any items
-            if batch:
-                yield batch
+                finished = True
+            finally:
+                # Also store a partial run (stopped or closed early), the rest is resumed from its last timetable
+                if cache_key is not None and entries:
+                    self.schedule_cache.put(cache_key, fingerprint, entries, finished and not truncated)
                             
         except Exception as e:
             print(f"Error in batch generator: {str(e)}")
             return []  # החזר רשימה ריקה במקום 
 
 
+    async def get_all_options_async(self, file_path1, file_path2, batch_size=100, prefetch=2, executor=None,
+                                    **options):
+        """
+        Asynchronous variant of get_all_options, for a headless service or a Qt event loop running asyncio:
+        yields the same batches while the search itself runs in an executor (the default thread pool unless
+        one is given), so many requests can be served from one process without a thread dedicated to each.
+        At most prefetch batches are searched ahead of the consumer - after that the search waits for it.
+        Close it (e.g. with contextlib.aclosing) to stop early; what was found is still stored in the cache.
+        options are passed on to get_all_options.
+        """
+        loop = asyncio.get_running_loop()
+        batches = self.get_all_options(file_path1, file_path2, batch_size, **options)
+        queue = asyncio.Queue(maxsize=prefetch)
+        done = object()
+        searching = None  # the search step running in the executor
+
+        async def produce():
+            nonlocal searching
+            while True:
+                searching = loop.run_in_executor(executor, next, batches, done)
+                try:
+                    # Shielded - a step that already started has to finish before the generator can be closed
+                    batch = await asyncio.shield(searching)
+                except Exception as e:
+                    batch = e  # raised to the consumer
+                await queue.put(batch)
+                if batch is done or isinstance(batch, Exception):
+                    return
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                batch = await queue.get()
+                if batch is done:
+                    return
+                if isinstance(batch, Exception):
+                    raise batch
+                yield batch
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+            if searching is not None:
+                await asyncio.gather(searching, return_exceptions=True)
+            await loop.run_in_executor(executor, batches.close)
+
+    def get_best_options(self, file_path1, file_path2, key, ascending=True, count=20, time_budget=None):
+        """
+        Returns the best timetables of the selected courses by one metric, best first.
+        With a time_budget (in seconds), returns the best ones found by then - good options
+        quickly even when searching every timetable would take minutes.
+        """
+        selected_courses_info = self.load_selection(file_path1, file_path2)
+        return ScheduleService().generate_best(
+            selected_courses_info, key, count, ascending,
+            forbidden_mask=self._forbidden_mask, time_budget=time_budget
+        )
+
+    def get_sample_options(self, file_path1, file_path2, count=100, seed=None):
+        """
+        Returns timetables drawn uniformly at random from all the timetables of the selected courses,
+        a representative preview of a selection with too many timetables to scroll through.
+        """
+        selected_courses_info = self.load_selection(file_path1, file_path2)
+        return list(ScheduleService().sample_schedules(
+            selected_courses_info, count, seed, forbidden_mask=self._forbidden_mask
+        ))
+
+    def get_pareto_options(self, file_path1, file_path2, objectives=None):
+        """
+        Returns the best trade-off timetables of the selected courses: the ones no other timetable
+        beats on one metric without losing on another (see ScheduleService.generate_pareto_front).
+        """
+        selected_courses_info = self.load_selection(file_path1, file_path2)
+        return ScheduleService().generate_pareto_front(
+            selected_courses_info, objectives, forbidden_mask=self._forbidden_mask
+        )
+
+    def load_selection(self, file_path1, file_path2) -> list:
+        """
+        Loads the selected courses once, so a run can pass the same courses to find_conflicting_courses,
+        get_all_options and count_options (the time constraints are searched as forbidden slots, not as courses).
+        """
+        return self.get_selected_courses_info(file_path1, file_path2, include_blocks=False)
+
+    def find_conflicting_courses(self, file_path1, file_path2, courses=None) -> tuple[list, bool]:
+        """
+        Quickly checks whether the selected courses can be taken together, without building the timetables.
+        Returns the codes of a small set of courses that cannot coexist (empty if no conflict was found)
+        and whether the time constraints are part of the conflict.
+        courses are the selected courses when they were already loaded (see load_selection).
+        """
+        if courses is None:
+            courses = self.load_selection(file_path1, file_path2)
+        return ScheduleService().find_conflicting_courses(courses, self._forbidden_mask)
+
+    def _get_schedule_cache_key(self, file_path1, selected_courses, collapse_equivalent: bool) -> str:
+        """Returns the schedule cache key of the selected courses, the time constraints and the catalog they come from"""
+        if self.use_database and file_path1 is None:
+            catalog_revision = self.db_manager.get_catalog_revision()
+        else:
+            catalog_revision = f"{file_path1}:{os.path.getmtime(file_path1)}"
+        return ScheduleCacheManager.make_key(
+            selected_courses, self._time_constraints, catalog_revision, {'collapse_equivalent': collapse_equivalent}
+        )
+
+    def count_options(self, file_path1, file_path2, courses=None) -> int:
+        """
+        Returns the exact number of timetables for the selected courses, without building them.
+        courses are the selected courses when they were already loaded (see load_selection).
+        """
+        if courses is None:
+            courses = self.load_selection(file_path1, file_path2)
+        return ScheduleService().count_schedules(courses, self._forbidden_mask)
+
+    def create_schedule_cursor(self, timetable, count: int = 0) -> ScheduleCursor:
+        """
+        Returns a cursor pointing right after a timetable returned by get_all_options,
+        count is how many timetables were loaded up to it.
+        """
+        return ScheduleService().create_cursor(timetable, count=count)
+
     def save_courses_to_file(self, file_path: str, courses: list):
         """
         Save the courses to a file.
@@ -196,10 +364,18 @@ class FileController:
     def apply_time_constraints(self, constraints: list[dict]):
         """Set the dummy courses to be injected as blocked time slots."""
         self._injected_constraints = self.time_constraints_service.generate_busy_slots(constraints)
+        self._time_constraints = list(constraints)
+        self._forbidden_mask = self.time_constraints_service.generate_forbidden_mask(constraints)
 
     def clear_time_constraints(self):
         """Clear any previously set time constraints (remove dummy courses)."""
         self._injected_constraints = []
+        self._time_constraints = []
+        self._forbidden_mask = 0
+
+    def get_time_constraint_blocks(self) -> list:
+        """Returns the dummy courses of the time constraints, to show the blocked slots in the timetables."""
+        return self._injected_constraints
 
     def check_if_courses_in_database(self, list_of_courses: list) -> list:
         """
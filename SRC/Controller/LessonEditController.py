@@ -1,9 +1,11 @@
 # SRC/Controllers/LessonEditController.py
+from SRC.Services.TimetableMetricsService import TimetableMetricsService
 
 class LessonEditController:
     def __init__(self, timetable, lesson_edit_service):
         self.timetable = timetable
         self.lesson_edit_service = lesson_edit_service
+        self.metrics_service = TimetableMetricsService()
 
     def get_alternatives(self, course_code, selected_lesson):
         return self.lesson_edit_service.get_alternative_lessons(course_code, selected_lesson)
@@ -12,6 +14,5 @@ class LessonEditController:
         success = self.lesson_edit_service.replace_lesson(self.timetable, old_lesson, new_lesson)
         if success:
             # עדכון המטריקות מחדש
-            from SRC.Services.TimetableMetricsService import TimetableMetricsService
-            TimetableMetricsService().generate_metrics(self.timetable)
+            self.timetable.metrics = self.metrics_service.compute_metrics_batch([self.timetable])[0]
         return success
@@ -4,7 +4,7 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 from SRC.Models.Course import Course
 from SRC.Models.Lesson import Lesson
-from SRC.Models.LessonTimes import LessonTimes
+from SRC.Models.LessonTimes import LessonTimes, MINUTES_PER_HOUR
 from SRC.Models.ValidationError import ValidationError
 
 
@@ -47,6 +47,8 @@ class DatabaseManager:
                         lesson_type TEXT NOT NULL,
                         start_hour INTEGER NOT NULL,
                         end_hour INTEGER NOT NULL,
+                        start_time INTEGER,  -- minutes since midnight
+                        end_time INTEGER,  -- minutes since midnight
                         day INTEGER NOT NULL,
                         building TEXT,
                         room TEXT,
@@ -59,6 +61,14 @@ class DatabaseManager:
                         FOREIGN KEY (course_id) REFERENCES courses (id) ON DELETE CASCADE
                     )
                 ''')
+
+                # Databases created before lesson times had minutes only have the whole hours
+                cursor.execute('PRAGMA table_info(lessons)')
+                lesson_columns = {column[1] for column in cursor.fetchall()}
+                for column, hour_column in (('start_time', 'start_hour'), ('end_time', 'end_hour')):
+                    if column not in lesson_columns:
+                        cursor.execute(f'ALTER TABLE lessons ADD COLUMN {column} INTEGER')
+                        cursor.execute(f'UPDATE lessons SET {column} = {hour_column} * {MINUTES_PER_HOUR}')
                 
                 # Create indexes for better performance
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_courses_code ON courses(code)')
@@ -165,13 +175,15 @@ class DatabaseManager:
                             
                             cursor.execute('''
                                 INSERT INTO lessons (
-                                    course_id, lesson_type, start_hour, end_hour, day,
+                                    course_id, lesson_type, start_hour, end_hour,
+                                    start_time, end_time, day,
                                     building, room, instructors, credit_points, 
                                     weekly_hours, group_code
-                                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                             ''', (
                                 course_id, lesson_type,
-                                lesson.time.start_hour, lesson.time.end_hour, lesson.time.day,
+                                lesson.time.start_hour, lesson.time.end_hour,
+                                lesson.time.start_time, lesson.time.end_time, lesson.time.day,
                                 lesson.building or '', lesson.room or '',
                                 instructors_json,
                                 getattr(lesson, 'creditPoints', 0),
@@ -220,21 +232,21 @@ class DatabaseManager:
                     
                     # Get lessons for this course
                     cursor.execute('''
-                        SELECT lesson_type, start_hour, end_hour, day, building, room,
+                        SELECT lesson_type, start_time, end_time, day, building, room,
                                instructors, credit_points, weekly_hours, group_code
                         FROM lessons 
                         WHERE course_id = ?
-                        ORDER BY lesson_type, day, start_hour
+                        ORDER BY lesson_type, day, start_time
                     ''', (course_id,))
                     
                     for lesson_row in cursor.fetchall():
-                        (lesson_type, start_hour, end_hour, day, building, room,
+                        (lesson_type, start_time, end_time, day, building, room,
                          instructors_json, credit_points, weekly_hours, group_code) = lesson_row
                         
                         instructors = json.loads(instructors_json) if instructors_json else []
                         
                         lesson = Lesson(
-                            time=LessonTimes(start_hour, end_hour, day),
+                            time=LessonTimes.from_minutes(start_time, end_time, day),
                             lesson_type=lesson_type,
                             building=building or '',
                             room=room or '',
@@ -379,6 +391,24 @@ class DatabaseManager:
             print(f"Error getting database stats: {e}")
             return {}
         
+    def get_catalog_revision(self) -> str:
+        """
+        Get a revision string of the catalog, which changes whenever courses or lessons
+        are added, replaced or deleted (used to invalidate cached timetables)
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT COUNT(*), MAX(id), MAX(updated_at) FROM courses')
+                courses_revision = cursor.fetchone()
+                cursor.execute('SELECT COUNT(*), MAX(id), MAX(updated_at) FROM lessons')
+                lessons_revision = cursor.fetchone()
+                return json.dumps([courses_revision, lessons_revision])
+
+        except sqlite3.Error as e:
+            print(f"Error getting catalog revision: {e}")
+            return ""
+
     def check_courses_exist(self, courses: List[Course]) -> Dict[str, bool]:
         """
         Check if each course in the list exists in the database.
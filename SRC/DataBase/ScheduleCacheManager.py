@@ -0,0 +1,139 @@
+import sqlite3
+import hashlib
+import json
+import time
+from typing import Optional, Dict, Any
+
+
+class ScheduleCacheManager:
+    """
+    Class for caching generated timetables in a local SQLite file.
+    Every entry holds the compact encodings of the timetables of one selection (course codes,
+    time constraints and catalog revision), so the same selection does not have to be searched again.
+    The least recently used entries are evicted once there are more than max_entries.
+    """
+
+    def __init__(self, db_path: str = "schedule_cache.db", max_entries: int = 20, max_timetables: int = 10000):
+        """
+        Initialize schedule cache manager
+
+        Args:
+            db_path: Path to SQLite database file
+            max_entries: How many selections are kept before the least recently used one is evicted
+            max_timetables: How many timetables are stored per selection (the rest are resumed from the last one)
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_timetables = max_timetables
+        self.init_database()
+
+    def init_database(self):
+        """Initialize the cache table"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS schedule_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        fingerprint TEXT NOT NULL,
+                        entries TEXT NOT NULL,  -- JSON array of [combination indices, metrics]
+                        complete INTEGER DEFAULT 0,
+                        last_used REAL NOT NULL
+                    )
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_schedule_cache_last_used ON schedule_cache(last_used)')
+                conn.commit()
+
+        except sqlite3.Error as e:
+            print(f"Error initializing schedule cache: {e}")
+            raise
+
+    @staticmethod
+    def make_key(course_codes, constraints, catalog_revision: str, options: dict = None) -> str:
+        """
+        Returns the cache key of a selection: a hash of the selected course codes,
+        the time constraints, the catalog revision and the search options.
+        """
+        data = {
+            'courses': sorted(str(code) for code in course_codes),
+            'constraints': sorted(json.dumps(constraint, sort_keys=True) for constraint in constraints or []),
+            'catalog_revision': catalog_revision,
+            'options': options or {}
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached timetables of a selection and mark it as recently used
+
+        Returns:
+            Dict with fingerprint, entries and complete, or None if not cached
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT fingerprint, entries, complete FROM schedule_cache WHERE cache_key = ?',
+                               (cache_key,))
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+
+                cursor.execute('UPDATE schedule_cache SET last_used = ? WHERE cache_key = ?',
+                               (time.time(), cache_key))
+                conn.commit()
+                return {
+                    'fingerprint': row[0],
+                    'entries': json.loads(row[1]),
+                    'complete': bool(row[2])
+                }
+
+        except sqlite3.Error as e:
+            print(f"Error reading schedule cache: {e}")
+            return None
+
+    def put(self, cache_key: str, fingerprint: str, entries: list, complete: bool) -> bool:
+        """
+        Store the timetables of a selection and evict the least recently used selections
+
+        Args:
+            fingerprint: Fingerprint of the search space the combination indices refer to
+            entries: [combination indices, metrics] of every timetable, in the order they were generated
+            complete: True if entries holds every timetable of the selection
+
+        Returns:
+            bool: True if successful
+        """
+        if len(entries) > self.max_timetables:
+            entries = entries[:self.max_timetables]
+            complete = False
+
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT OR REPLACE INTO schedule_cache (cache_key, fingerprint, entries, complete, last_used)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (cache_key, fingerprint, json.dumps(entries), int(complete), time.time()))
+
+                cursor.execute('''
+                    DELETE FROM schedule_cache WHERE cache_key NOT IN (
+                        SELECT cache_key FROM schedule_cache ORDER BY last_used DESC LIMIT ?
+                    )
+                ''', (self.max_entries,))
+                conn.commit()
+                return True
+
+        except sqlite3.Error as e:
+            print(f"Error writing schedule cache: {e}")
+            return False
+
+    def clear(self) -> bool:
+        """Remove all cached timetables"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute('DELETE FROM schedule_cache')
+                conn.commit()
+                return True
+        except sqlite3.Error as e:
+            print(f"Error clearing schedule cache: {e}")
+            return False
@@ -0,0 +1,62 @@
+from SRC.Models.TimeTable import TimeTable
+from SRC.Models.TimetableMetrics import TimetableMetrics
+
+class LazyTimeTable(TimeTable):
+    """
+    A timetable found by the schedule search, kept as the index of the chosen combination
+    of every course together with its precomputed metrics.
+    The Course objects are only built the first time the courses are needed (e.g. when displayed),
+    and all the timetables of one search share the same search space.
+    A timetable expanded from a collapsed one keeps the collapsed combination indices, and
+    alternative_indices picks the equivalent combination of every course it uses instead.
+    """
+    def __init__(self, search_space, combination_indices: tuple, metrics: TimetableMetrics = None,
+                 alternative_indices: tuple = None):
+        super().__init__()
+        self._search_space = search_space  # ScheduleSearchSpace the combination indices refer to
+        self._combination_indices = combination_indices  # index of the chosen combination of every course
+        self._alternative_indices = alternative_indices  # index in every course's equivalents (None: the searched one)
+        self._courses = None  # built on first access
+        self._alternatives = None  # built on first access
+        self._metrics = metrics
+
+    @property
+    def search_space(self):
+        return self._search_space
+
+    @property
+    def combination_indices(self):
+        return self._combination_indices
+
+    @property
+    def alternative_indices(self):
+        return self._alternative_indices
+
+    @property
+    def courses(self):
+        if self._courses is None:
+            self._courses = self._search_space.create_courses(self._combination_indices, self._alternative_indices)
+        return self._courses
+
+    @property
+    def lessons(self):
+        if self._courses is None:
+            # Read from the combinations, so the metrics that only need the lessons do not build the courses
+            return self._search_space.get_lessons(self._combination_indices, self._alternative_indices)
+        return super().lessons
+
+    @courses.setter
+    def courses(self, value):
+        self._courses = value
+        self._metric_values = {}
+
+    @property
+    def alternatives(self):
+        if self._alternatives is None:
+            self._alternatives = self._search_space.create_alternatives(self._combination_indices, self.courses,
+                                                                        self._alternative_indices)
+        return self._alternatives
+
+    @alternatives.setter
+    def alternatives(self, value):
+        self._alternatives = value
@@ -1,24 +1,93 @@
+MINUTES_PER_HOUR = 60
+MINUTES_PER_DAY = 24 * MINUTES_PER_HOUR
+
 class LessonTimes:
+    """
+    The day and times of a lesson.
+    The times are kept as integer minutes since midnight, so comparing and measuring them
+    never parses strings. An hour can be given as an int (a whole hour) or as an "HH:MM" string.
+    """
     def __init__(self, start_hour: int = 0, end_hour: int = 0, day: int = 0):
-        self._start_hour = start_hour  # start hour (8-20)
-        self._end_hour = end_hour  # end hour (9-21)
+        self._start_time = self.to_minutes(start_hour)  # start time in minutes since midnight (8:00-20:00)
+        self._end_time = self.to_minutes(end_hour)  # end time in minutes since midnight (9:00-21:00)
         self._day = day  # day of the week (1-6, where 1 is Sunday and 6 is Friday)
 
+    @classmethod
+    def from_minutes(cls, start_time: int, end_time: int, day: int = 0):
+        """Creates the times of a lesson from minutes since midnight (kept exact)"""
+        time = cls(day=day)
+        time.start_time = start_time
+        time.end_time = end_time
+        return time
+
+    @staticmethod
+    def to_minutes(time_val) -> int:
+        """Converts an hour given as an int or an "HH:MM" string to minutes since midnight"""
+        if isinstance(time_val, str):
+            hours, _, minutes = time_val.strip().partition(":")
+            return int(hours) * MINUTES_PER_HOUR + int(minutes or 0)
+        return round(time_val * MINUTES_PER_HOUR)
+
+    @staticmethod
+    def to_hours(minutes: int):
+        """Converts minutes to hours - an int when they are whole hours"""
+        if minutes % MINUTES_PER_HOUR == 0:
+            return minutes // MINUTES_PER_HOUR
+        return minutes / MINUTES_PER_HOUR
+
+    @staticmethod
+    def format_time(minutes: int) -> str:
+        """Formats minutes since midnight as HH:MM"""
+        return f"{minutes // MINUTES_PER_HOUR:02d}:{minutes % MINUTES_PER_HOUR:02d}"
+
     @property
     def start_hour(self):
-        return self._start_hour
+        """the hour the lesson starts in"""
+        return self._start_time // MINUTES_PER_HOUR
 
     @start_hour.setter
     def start_hour(self, value):
-        self._start_hour = value
+        self._start_time = self.to_minutes(value)
 
     @property
     def end_hour(self):
-        return self._end_hour
+        """the hour the lesson ends in (rounded down, like start_hour)"""
+        return self._end_time // MINUTES_PER_HOUR
 
     @end_hour.setter
     def end_hour(self, value):
-        self._end_hour = value
+        self._end_time = self.to_minutes(value)
+
+    @property
+    def slot_end_hour(self):
+        """the hour after the last hourly slot the lesson takes (a lesson ending within an hour also takes it)"""
+        return -(-self._end_time // MINUTES_PER_HOUR)
+
+    @property
+    def start_time(self):
+        return self._start_time
+
+    @start_time.setter
+    def start_time(self, value: int):
+        self._start_time = value
+
+    @property
+    def end_time(self):
+        return self._end_time
+
+    @end_time.setter
+    def end_time(self, value: int):
+        self._end_time = value
+
+    @property
+    def week_start(self):
+        """the start time in minutes since the start of the week"""
+        return int(self._day) * MINUTES_PER_DAY + self._start_time
+
+    @property
+    def week_end(self):
+        """the end time in minutes since the start of the week"""
+        return int(self._day) * MINUTES_PER_DAY + self._end_time
 
     @property
     def day(self):
@@ -28,9 +97,13 @@ class LessonTimes:
     def day(self, value):
         self._day = value
 
+    def overlaps(self, other) -> bool:
+        """returns True if the two lessons meet at the same time"""
+        return self.week_start < other.week_end and other.week_start < self.week_end
+
     def __eq__(self, other):
         return (
             self.day == other.day and
-            self.start_hour == other.start_hour and
-            self.end_hour == other.end_hour
+            self.start_time == other.start_time and
+            self.end_time == other.end_time
         )
@@ -0,0 +1,49 @@
+class ScheduleCursor:
+    """
+    This class represents a position in the timetable search, so an enumeration can be resumed later.
+
+    - fingerprint: identifies the search space (courses, lessons and options) the cursor belongs to
+    - ordering: the course ordering the search was run with
+    - combination_indices: the chosen combination of every course in the last timetable that was yielded
+    - count: how many timetables were yielded up to and including that one
+    """
+    def __init__(self, fingerprint: str = "", ordering: str = "", combination_indices: tuple = None, count: int = 0):
+        self._fingerprint = fingerprint
+        self._ordering = ordering
+        self._combination_indices = tuple(combination_indices) if combination_indices else ()
+        self._count = count
+
+    @property
+    def fingerprint(self):
+        return self._fingerprint
+
+    @property
+    def ordering(self):
+        return self._ordering
+
+    @property
+    def combination_indices(self):
+        return self._combination_indices
+
+    @property
+    def count(self):
+        return self._count
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary"""
+        return {
+            'fingerprint': self._fingerprint,
+            'ordering': self._ordering,
+            'combination_indices': list(self._combination_indices),
+            'count': self._count
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ScheduleCursor':
+        """Create cursor from dictionary"""
+        return cls(
+            fingerprint=data.get('fingerprint', ''),
+            ordering=data.get('ordering', ''),
+            combination_indices=data.get('combination_indices', []),
+            count=data.get('count', 0)
+        )
@@ -0,0 +1,162 @@
+from SRC.Models.Course import Course
+from SRC.Models.LessonTimes import LessonTimes, MINUTES_PER_HOUR, MINUTES_PER_DAY
+
+class ScheduleSearchSpace:
+    """
+    This class holds the precomputed data used to search the timetables of one course selection.
+
+    - combinations: for each course, the list of its valid lesson combinations
+    - masks: for each course, the week-occupancy bitmask of every combination
+    - compatibility: compatibility[i][a][j] is a bitset of the combinations of course j
+      that do not conflict with combination a of course i
+    - course_masks: for each course, the union of the masks of all of its combinations
+    - forbidden_mask: slots of the time constraints; no combination meets in any of them
+    - slot_minutes: the length of the time slot of each bit of the masks
+    - equivalents: when equivalent combinations are collapsed, for each course and each searched
+      combination, the group of combinations that meet at exactly the same times (searched one first)
+    """
+    def __init__(self, combinations: list = None, masks: list = None, compatibility: list = None, forbidden_mask: int = 0,
+                 slot_minutes: int = MINUTES_PER_HOUR):
+        self._combinations = combinations if combinations else []  # list of combination lists, one per course
+        self._masks = masks if masks else []  # list of bitmask lists, one per course
+        self._compatibility = compatibility if compatibility else []  # pairwise combination compatibility table
+        self._forbidden_mask = forbidden_mask  # slots of time constraints (already filtered out)
+        self._slot_minutes = slot_minutes  # minutes of the time slot of each mask bit
+        self._equivalents = []  # groups of time-equivalent combinations (empty when not collapsed)
+        self._fingerprint = ""  # hash of the combinations, to match saved search positions
+        self._course_masks = []  # every slot each course may use
+        for course_masks in self._masks:
+            union = 0
+            for mask in course_masks:
+                union |= mask
+            self._course_masks.append(union)
+
+    @property
+    def combinations(self):
+        return self._combinations
+
+    @property
+    def masks(self):
+        return self._masks
+
+    @property
+    def compatibility(self):
+        return self._compatibility
+
+    @compatibility.setter
+    def compatibility(self, value):
+        self._compatibility = value
+
+    @property
+    def forbidden_mask(self):
+        return self._forbidden_mask
+
+    @forbidden_mask.setter
+    def forbidden_mask(self, value):
+        self._forbidden_mask = value
+
+    @property
+    def slot_minutes(self):
+        return self._slot_minutes
+
+    @property
+    def equivalents(self):
+        return self._equivalents
+
+    @equivalents.setter
+    def equivalents(self, value):
+        self._equivalents = value
+
+    @property
+    def fingerprint(self):
+        return self._fingerprint
+
+    @fingerprint.setter
+    def fingerprint(self, value):
+        self._fingerprint = value
+
+    @property
+    def course_masks(self):
+        return self._course_masks
+
+    @property
+    def course_count(self):
+        return len(self._masks)
+
+    def full_domains(self) -> list:
+        """returns, for each course, a bitset with all of its combinations"""
+        return [(1 << len(course_masks)) - 1 for course_masks in self._masks]
+
+    def create_courses(self, combination_indices, alternative_indices=None) -> list:
+        """
+        builds the Course objects of a timetable from the chosen combination of every course
+        (alternative_indices, when given, picks one of each combination's equivalents instead)
+        """
+        return [self.create_course(combo) for combo in self._get_chosen(combination_indices, alternative_indices)]
+
+    def get_lessons(self, combination_indices, alternative_indices=None) -> list:
+        """returns the lessons of a timetable from the chosen combination of every course, without building its courses"""
+        return [lesson for combo in self._get_chosen(combination_indices, alternative_indices)
+                for lesson in combo[2:] if lesson]
+
+    def _get_chosen(self, combination_indices, alternative_indices=None) -> list:
+        """returns the chosen combination of every course (see create_courses)"""
+        if alternative_indices is None:
+            return [combinations[combo_index]
+                    for combinations, combo_index in zip(self._combinations, combination_indices)]
+        return [groups[combo_index][alternative_index]
+                for groups, combo_index, alternative_index
+                in zip(self._equivalents, combination_indices, alternative_indices)]
+
+    def create_alternatives(self, combination_indices, courses: list, alternative_indices=None) -> list:
+        """
+        builds, for each course of a timetable, the courses that can replace it without changing any time
+        (the course itself first). Returns an empty list when equivalent combinations were not collapsed.
+        """
+        if not self._equivalents:
+            return []
+        if alternative_indices is None:
+            alternative_indices = [0] * len(courses)
+        return [
+            [course] + [self.create_course(combo) for position, combo in enumerate(groups[combo_index])
+                        if position != alternative_index]
+            for course, groups, combo_index, alternative_index
+            in zip(courses, self._equivalents, combination_indices, alternative_indices)
+        ]
+
+    @staticmethod
+    def get_time_mask(time: LessonTimes, slot_minutes: int = MINUTES_PER_HOUR) -> int:
+        """
+        encodes a lesson time as a week-occupancy bitmask.
+        Each (day, slot) is one bit: bit index = day * (slots per day) + slot, with slots of slot_minutes
+        (whole hours by default - the layout of forbidden masks).
+        A partial slot at the start or end occupies the whole slot.
+        """
+        start_slot = time.start_time // slot_minutes
+        end_slot = -(-time.end_time // slot_minutes)
+        if end_slot <= start_slot:
+            return 0
+
+        day_slots = MINUTES_PER_DAY // slot_minutes
+        return ((1 << (end_slot - start_slot)) - 1) << (int(time.day) * day_slots + start_slot)
+
+    @staticmethod
+    def create_course(combo) -> Course:
+        """builds a Course holding only the lessons of one combination"""
+        name, code, lec, ex, lab, dept, reinf, train = combo
+        return Course(
+            name=name,
+            code=code,
+            lectures=[lec] if lec else [],
+            exercises=[ex] if ex else [],
+            labs=[lab] if lab else [],
+            departmentHours=[dept] if dept else [],
+            reinforcement=[reinf] if reinf else [],
+            training=[train] if train else []
+        )
+
+    def without_combinations(self):
+        """returns a compact copy without the lesson objects, to be sent to worker processes"""
+        compact = ScheduleSearchSpace(None, self._masks, self._compatibility, self._forbidden_mask, self._slot_minutes)
+        compact.fingerprint = self._fingerprint
+        return compact
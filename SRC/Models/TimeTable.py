@@ -5,6 +5,8 @@ class TimeTable:
 
         self._courses = courses if courses else []  # list of courses in the timetable
         self._metrics = None # TimetableMetrics object to hold metrics
+        self._alternatives = [] # per course, the courses that can replace it without changing any time (itself first)
+        self._metric_values = {} # values of the registered metrics computed so far (see MetricsRegistry)
 
     @property
     def courses(self):
@@ -13,6 +15,7 @@ class TimeTable:
     @courses.setter
     def courses(self, value):
         self._courses = value
+        self._metric_values = {}
 
         
     @property
@@ -22,7 +25,36 @@ class TimeTable:
     @metrics.setter
     def metrics(self, value: TimetableMetrics):
         self._metrics = value
+        self._metric_values = {}
+
+    @property
+    def lessons(self):
+        """returns all the lessons of the timetable's courses"""
+        return [lesson for course in self.courses
+                for lesson_list in (course.lectures, course.exercises, course.labs, course.departmentHours,
+                                    course.reinforcement, course.training)
+                for lesson in lesson_list or []]
+
+    @property
+    def metric_values(self):
+        return self._metric_values
     
+    @property
+    def alternatives(self):
+        return self._alternatives
+
+    @alternatives.setter
+    def alternatives(self, value):
+        self._alternatives = value
+
+    @property
+    def alternatives_count(self):
+        """returns how many timetables share this time layout (1 when there are no alternatives)"""
+        count = 1
+        for course_alternatives in self.alternatives:
+            count *= len(course_alternatives)
+        return count
+
     @property
     def get_lesson_times(self):
         """returns a list of all lesson times in the timetable"""
@@ -2,15 +2,16 @@ import pandas as pd
 from typing import List
 from SRC.Models.Course import Course
 from SRC.Models.Lesson import Lesson
+from SRC.Models.LessonTimes import LessonTimes
 
 
 class ExcelExportManager:
     @staticmethod
-    def format_time_range(start_hour: int, end_hour: int) -> str:
-        """Convert hour range to Hebrew time format"""
-        if start_hour == 0 and end_hour == 0:
+    def format_time_range(start_time: int, end_time: int) -> str:
+        """Convert a time range (in minutes since midnight) to Hebrew time format"""
+        if start_time == 0 and end_time == 0:
             return ""
-        return f"{start_hour:02d}:00-{end_hour:02d}:00"
+        return f"{LessonTimes.format_time(start_time)}-{LessonTimes.format_time(end_time)}"
     
     @staticmethod
     def format_day_to_hebrew(day: int) -> str:
@@ -33,7 +34,7 @@ class ExcelExportManager:
             return ""
         
         day_hebrew = ExcelExportManager.format_day_to_hebrew(lesson.time.day)
-        time_range = ExcelExportManager.format_time_range(lesson.time.start_hour, lesson.time.end_hour)
+        time_range = ExcelExportManager.format_time_range(lesson.time.start_time, lesson.time.end_time)
 
         if day_hebrew and time_range:
             return f"{day_hebrew} {time_range}"
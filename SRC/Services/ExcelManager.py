@@ -10,14 +10,15 @@ from SRC.Models.ValidationError import ValidationError
 class ExcelManager(FileManager):
     @staticmethod
     def parse_time_range(time_str: str) -> tuple:
+        """Returns the (start, end) of a time range as "HH:MM" strings, or (0, 0) when it is invalid"""
         if not time_str or pd.isna(time_str):
             return (0, 0)
 
         time_match = re.search(r'(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})', str(time_str))
         if time_match:
-            start_hour = int(time_match.group(1))
-            end_hour = int(time_match.group(3))
-            return (start_hour, end_hour)
+            start = f"{int(time_match.group(1)):02}:{time_match.group(2)}"
+            end = f"{int(time_match.group(3)):02}:{time_match.group(4)}"
+            return (start, end)
         return (0, 0)
 
     @staticmethod
@@ -126,17 +127,17 @@ class ExcelManager(FileManager):
             if not time_str or pd.isna(row.get("time")):
                 continue
             
-            start_hour, end_hour = self.parse_time_range(time_str)
+            start, end = self.parse_time_range(time_str)
             day = self.parse_day_from_hebrew(time_str)
 
-            if start_hour == 0 and end_hour == 0:
+            if start == 0 and end == 0:
                 errors.append(ValidationError("Invalid time format", context=row_context))
             if day == 0:
                 errors.append(ValidationError("Invalid or missing day", context=row_context))
 
             try:
-                start_time = datetime.strptime(f"{start_hour:02}:00", "%H:%M")
-                end_time = datetime.strptime(f"{end_hour:02}:00", "%H:%M")
+                start_time = datetime.strptime(start if start else "00:00", "%H:%M")
+                end_time = datetime.strptime(end if end else "00:00", "%H:%M")
                 if not (datetime.strptime("08:00", "%H:%M") <= start_time < end_time <= datetime.strptime("22:00", "%H:%M")):
                     raise ValueError("Time must be between 08:00 and 22:00 and start < end")
             except Exception as e:
@@ -177,7 +178,7 @@ class ExcelManager(FileManager):
             course_key = f"{main_code}_{name}"
 
             lesson = Lesson(
-                time=LessonTimes(start_hour, end_hour, day),
+                time=LessonTimes(start, end, day),
                 lesson_type=lesson_type,
                 building=building,
                 room=room,
@@ -49,8 +49,7 @@ class LessonEditService:
 
     def has_conflict(self, timetable, new_lesson, exclude=None):
         return any(
-            l.time.day == new_lesson.time.day and
-            not (l.time.end_hour <= new_lesson.time.start_hour or l.time.start_hour >= new_lesson.time.end_hour)
+            l.time.overlaps(new_lesson.time)
             for l in self.get_all_lessons(timetable)
             if l != exclude  
         )
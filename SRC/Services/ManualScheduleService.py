@@ -17,6 +17,7 @@ class ManualScheduleService:
         self.repository = {course.code: course for course in repository}
         self.schedule = [] # Initialize an empty schedule - this will hold the lessons added to the schedule
         self.undo_stack = [] # Initialize an empty undo stack
+        self.metrics_service = TimetableMetricsService() # Stateless, so one instance serves every schedule
         self.lesson_type_map = {
             "Lecture": "_lectures",
             "Exercise": "_exercises",
@@ -84,7 +85,7 @@ class ManualScheduleService:
         for lesson in lessons:
             day = DAYS[lesson.time.day - 1]
             start = lesson.time.start_hour
-            end = lesson.time.end_hour
+            end = lesson.time.slot_end_hour
 
             for hour in range(start, end):
                 # slot_map[(day, hour)] = lesson
@@ -111,7 +112,7 @@ class ManualScheduleService:
                     for lesson in lessons:
                         day = DAYS[lesson.time.day - 1]
                         start = lesson.time.start_hour
-                        end = lesson.time.end_hour
+                        end = lesson.time.slot_end_hour
 
                         for hour in range(start, end):
                             self.slot_map[(day, hour)].append({
@@ -166,7 +167,7 @@ class ManualScheduleService:
         for course_id, lesson in self.schedule:
             day = DAYS[lesson.time.day - 1]
             start = lesson.time.start_hour
-            end = lesson.time.end_hour
+            end = lesson.time.slot_end_hour
             
             matches_requested_lesson = False
         
@@ -224,8 +225,7 @@ class ManualScheduleService:
                 if lesson.time.day != selected_lesson.time.day:
                     continue  # different day, no collision
 
-                if not (lesson.time.end_hour <= selected_lesson.time.start_hour or
-                        lesson.time.start_hour >= selected_lesson.time.end_hour):
+                if lesson.time.overlaps(selected_lesson.time):
                     # Overlap in time on same day
                     collides = True
                     break
@@ -296,10 +296,7 @@ class ManualScheduleService:
         """
         Returns True if l1 and l2 overlap (even partitial overlaping) in time on the same day.
         """
-        return l1.time.day == l2.time.day and not (
-            l1.time.end_hour <= l2.time.start_hour or
-            l1.time.start_hour >= l2.time.end_hour
-        )
+        return l1.time.overlaps(l2.time)
 
     def create_schedule(self):
         """
@@ -336,8 +333,7 @@ class ManualScheduleService:
             result_courses.append(new_course)
 
         timetable = TimeTable(result_courses)
-        metricsService = TimetableMetricsService()
-        metricsService.generate_metrics(timetable)  # Generate metrics for the timetable
+        timetable.metrics = self.metrics_service.compute_metrics_batch([timetable])[0]  # Generate metrics for the timetable
         return timetable
 
     def is_lesson_type_taken(self, course_id, lesson_type):
@@ -0,0 +1,106 @@
+from SRC.Models.LessonTimes import LessonTimes
+
+class MetricsRegistry:
+    """
+    A registry of the named metrics timetables can be compared by.
+    Each metric is a function of a timetable, computed the first time it is asked for
+    and then cached in that timetable (see TimeTable.metric_values), so a metric
+    nobody sorts or filters by costs nothing.
+    The metrics every timetable is created with are read from its TimetableMetrics; the others
+    are computed from TimeTable.lessons, which a LazyTimeTable reads from its search space
+    without building its Course objects. A metric that reads timetable.courses instead builds
+    them for every timetable it is sorted over.
+    New metrics plug in with the register decorator:
+
+        @MetricsRegistry.register("late_days", "Late Days")
+        def count_late_days(timetable):
+            ...
+    """
+    _metrics = dict()  # metric name -> (label, function), in registration order
+
+    @classmethod
+    def register(cls, name: str, label: str = None):
+        """Returns a decorator that registers a function of a timetable as the metric called name"""
+        def decorator(function):
+            cls._metrics[name] = (label or name, function)
+            return function
+        return decorator
+
+    @classmethod
+    def get_value(cls, timetable, name: str):
+        """Returns the value of a metric for a timetable, computing it only on its first use"""
+        values = timetable.metric_values
+        if name not in values:
+            if name not in cls._metrics:
+                raise ValueError(f"Unknown metric '{name}'. Use one of: {', '.join(cls._metrics)}.")
+            values[name] = cls._metrics[name][1](timetable)
+        return values[name]
+
+    @classmethod
+    def get_names(cls) -> list:
+        """Returns the names of all the registered metrics"""
+        return list(cls._metrics)
+
+    @classmethod
+    def get_labels(cls) -> dict:
+        """Returns the visible label of every registered metric, mapped to its name"""
+        return {label: name for name, (label, _) in cls._metrics.items()}
+
+
+# The metrics every timetable is created with (see TimetableMetrics)
+for _name, _label in (("active_days", "Active Days"),
+                      ("free_windows_number", "Free windows"),
+                      ("free_windows_sum", "Total free windows"),
+                      ("average_start_time", "Average Start Time"),
+                      ("average_end_time", "Average End Time")):
+    MetricsRegistry.register(_name, _label)(lambda timetable, name=_name: getattr(timetable.metrics, name))
+
+
+def _get_lessons_by_day(timetable) -> list:
+    """Returns the (start minute, end minute, building) of the lessons of every active day, sorted by start"""
+    lessons_by_day = {}
+    for lesson in timetable.lessons:  # Without building the courses of a LazyTimeTable
+        lessons_by_day.setdefault(lesson.time.day, []).append(
+            (lesson.time.start_time, lesson.time.end_time, lesson.building)
+        )
+    return [sorted(lessons, key=lambda lesson: lesson[0]) for lessons in lessons_by_day.values()]
+
+
+@MetricsRegistry.register("total_campus_hours", "Hours on Campus")
+def get_total_campus_hours(timetable) -> int:
+    """The hours from the first lesson to the end of the last one, summed over the days"""
+    return LessonTimes.to_hours(
+        sum(max(end for _, end, _ in lessons) - lessons[0][0] for lessons in _get_lessons_by_day(timetable))
+    )
+
+
+@MetricsRegistry.register("max_consecutive_hours", "Max Consecutive Hours")
+def get_max_consecutive_hours(timetable) -> int:
+    """The longest stretch of lessons without a break on any day"""
+    longest = 0
+    for lessons in _get_lessons_by_day(timetable):
+        block_start, block_end = lessons[0][0], lessons[0][1]
+        for start, end, _ in lessons[1:]:
+            if start > block_end:
+                longest = max(longest, block_end - block_start)
+                block_start = start
+            block_end = max(block_end, end)
+        longest = max(longest, block_end - block_start)
+    return LessonTimes.to_hours(longest)
+
+
+@MetricsRegistry.register("building_changes", "Building Changes")
+def get_building_changes(timetable) -> int:
+    """How many times a lesson is in another building than the lesson before it on the same day"""
+    changes = 0
+    for lessons in _get_lessons_by_day(timetable):
+        for previous, lesson in zip(lessons, lessons[1:]):
+            if lesson[2] != previous[2]:
+                changes += 1
+    return changes
+
+
+@MetricsRegistry.register("earliest_start", "Earliest Start")
+def get_earliest_start(timetable) -> int:
+    """The start time (in hours) of the earliest lesson of the week (0 when there are no lessons)"""
+    return LessonTimes.to_hours(min((lessons[0][0] for lessons in _get_lessons_by_day(timetable)), default=0))
@@ -1,6 +1,7 @@
 from SRC.Models.Course import Course
 from SRC.Models.Lesson import Lesson
 from SRC.Models.LessonTimes import LessonTimes
+from SRC.Models.ScheduleSearchSpace import ScheduleSearchSpace
 
 class TimeConstraintsService:
     def __init__(self):
@@ -9,6 +10,7 @@ class TimeConstraintsService:
     def generate_busy_slots(self, constraints: list[dict]) -> list[Course]:
         """
         Create dummy Course objects that block given time ranges.
+        They are used to show the blocks; the search itself uses generate_forbidden_mask.
         Each constraint is a dict like {"day": 2, "start": 10, "end": 12}
         """
         busy_courses = []
@@ -46,3 +48,15 @@ class TimeConstraintsService:
             self.block_counter += 1
 
         return busy_courses
+
+    def generate_forbidden_mask(self, constraints: list[dict]) -> int:
+        """
+        Compile the given time ranges into a single forbidden-slot mask for ScheduleService,
+        which removes every combination that meets in one of them before the search starts.
+        Each constraint is a dict like {"day": 2, "start": 10, "end": 12}
+        """
+        forbidden_mask = 0
+        for constraint in constraints:
+            time = LessonTimes(start_hour=constraint["start"], end_hour=constraint["end"], day=constraint["day"])
+            forbidden_mask |= ScheduleSearchSpace.get_time_mask(time)
+        return forbidden_mask
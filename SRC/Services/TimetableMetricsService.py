@@ -1,12 +1,18 @@
 from SRC.Models.TimetableMetrics import TimetableMetrics
 from SRC.Models.TimeTable import TimeTable
-from SRC.Models.LessonTimes import LessonTimes
+from SRC.Models.LessonTimes import LessonTimes, MINUTES_PER_HOUR
 
 from collections import defaultdict
+try:
+    import numpy as np
+except ImportError:  # Optional - without it a batch is calculated one timetable at a time
+    np = None
 
 class TimetableMetricsService:
-    def __init__(self):
-        timetable = None
+    """
+    Calculates the metrics of timetables. It keeps no state between calls,
+    so a single instance can be shared by several threads.
+    """
  
     # Method to apply user preferences details to the timetable.
     def generate_metrics(self, timetable):
@@ -19,47 +25,136 @@ class TimetableMetricsService:
         Returns:
             None: This method does not return anything, it updates the timetable's preferences details.
         """
-        self.timetable = timetable # set the current timetable to calculate preferences on
-        lesson_times = self.get_lesson_times()  # Get the lesson times from the timetable
+        lesson_times = self.get_lesson_times(timetable)  # Get the lesson times from the timetable
         
+        # Create the preferences details & update in the timetable
+        timetable.metrics = self.create_metrics(lesson_times)
+        # print(f"applied preferences: {self.timetable._metrics.active_days} active days, "
+        #       f"{self.timetable._metrics.free_windows_number} free windows, "
+        #       f"avg start time: {self.timetable._metrics.average_start_time}, "
+        #       f"avg end time: {self.timetable._metrics.average_end_time}")
+ 
+    # Method to calculate the metrics of many timetables at once.
+    def compute_metrics_batch(self, timetables):
+        """
+        Calculate the metrics of many timetables at once (the same values generate_metrics gives each one).
+
+        The lessons of all the timetables are kept in arrays (timetable, day, start minute, end minute)
+        sorted by timetable, day and start, so every metric is a sum over the rows where a day starts,
+        ends or has a gap after a lesson. Without NumPy, each timetable is calculated on its own.
+
+        Args:
+            timetables (list): The timetables to calculate the metrics of.
+        Returns:
+            list: The TimetableMetrics of every timetable, in the same order
+                (empty metrics for a timetable without lessons).
+        """
+        if np is None:
+            metrics = []
+            for timetable in timetables:
+                lesson_times = self.get_lesson_times(timetable)
+                metrics.append(self.create_metrics(lesson_times) if lesson_times else TimetableMetrics())
+            return metrics
+
+        # One row per lesson, with its times in minutes
+        rows, days, starts, ends = [], [], [], []
+        day_codes = {}
+        for row, timetable in enumerate(timetables):
+            for lesson_time in self.collect_lesson_times(timetable):
+                rows.append(row)
+                days.append(day_codes.setdefault(lesson_time.day, len(day_codes)))
+                starts.append(lesson_time.start_time)
+                ends.append(lesson_time.end_time)
+        rows, days, starts, ends = (np.array(values, dtype=np.int64) for values in (rows, days, starts, ends))
+
+        # Sorted by timetable, then day, then start hour (a stable sort, like group_lesson_times)
+        order = np.lexsort((starts, days, rows))
+        rows, days, starts, ends = rows[order], days[order], starts[order], ends[order]
+
+        # The first and the last lesson of every day of every timetable
+        first_of_day = np.ones(len(rows), dtype=bool)
+        first_of_day[1:] = (rows[1:] != rows[:-1]) | (days[1:] != days[:-1])
+        last_of_day = np.roll(first_of_day, -1)
+
+        count = len(timetables)
+        active_days = np.bincount(rows[first_of_day], minlength=count)
+        total_start = np.bincount(rows[first_of_day], weights=starts[first_of_day], minlength=count)
+        total_end = np.bincount(rows[last_of_day], weights=ends[last_of_day], minlength=count)
+
+        # A free window is a gap between a lesson and the next one on the same day
+        gaps = starts[1:] - ends[:-1]
+        windows = ~first_of_day[1:] & (gaps > 0)
+        free_windows_number = np.bincount(rows[1:][windows], minlength=count)
+        free_windows_minutes = np.bincount(rows[1:][windows], weights=gaps[windows], minlength=count)
+
+        metrics = []
+        for values in zip(active_days.tolist(), free_windows_number.tolist(), free_windows_minutes.tolist(),
+                          total_start.tolist(), total_end.tolist()):
+            days_count, windows_number, windows_minutes, start_sum, end_sum = values
+            metrics.append(TimetableMetrics(
+                active_days=days_count,
+                free_windows_number=windows_number,
+                free_windows_sum=LessonTimes.to_hours(int(windows_minutes)),
+                average_start_time=int(start_sum) / (MINUTES_PER_HOUR * days_count) if days_count else 0,
+                average_end_time=int(end_sum) / (MINUTES_PER_HOUR * days_count) if days_count else 0
+            ))
+        return metrics
+
+    # Method to calculate the metrics from lesson times grouped by day.
+    def create_metrics(self, lesson_times):
+        """
+        Calculate all the metrics of a timetable from its lesson times.
+
+        Args:
+            lesson_times (dict): Dictionary of lesson lists grouped by day, sorted by start hour
+                (see group_lesson_times).
+        Returns:
+            TimetableMetrics: The metrics of the timetable.
+        """
         # Calculate various preferences based on the timetable
         active_days = self.calculate_active_days(lesson_times=lesson_times)
         free_windows_num, free_windows_sum = self.calculate_free_windows(lesson_times=lesson_times)
         avg_start_time, avg_end_time = self.calculate_avg_times(lesson_times=lesson_times)
         
-        # Create the preferences details & update in the timetable
-        metrics = TimetableMetrics(
+        return TimetableMetrics(
             active_days=active_days,
             free_windows_number=free_windows_num,
             free_windows_sum=free_windows_sum,
             average_start_time=avg_start_time,
             average_end_time=avg_end_time
         )
-        
-        self.timetable.metrics = metrics
-        # print(f"applied preferences: {self.timetable._metrics.active_days} active days, "
-        #       f"{self.timetable._metrics.free_windows_number} free windows, "
-        #       f"avg start time: {self.timetable._metrics.average_start_time}, "
-        #       f"avg end time: {self.timetable._metrics.average_end_time}")
- 
+
     # Method to get the lesson times from the timetable.
-    def get_lesson_times(self):
+    def get_lesson_times(self, timetable):
         """ 
         Get the lesson times from the timetable.
-        
+
+        Args:
+            timetable (TimeTable): The timetable to get the lesson times of.
         Returns:
             defaultdict: A dictionary where keys are (active) days of the week,
                 and values are lists of LessonTimes objects for that day, sorted by start hour.
             
         """
-        if not self.timetable or not self.timetable.courses:
+        if not timetable or not timetable.courses:
+            return []
+        return self.group_lesson_times(self.collect_lesson_times(timetable))
+
+    # Method to collect the lesson times of all the lessons in the timetable.
+    def collect_lesson_times(self, timetable):
+        """
+        Collect the lesson times of all the lessons in the timetable.
+
+        Args:
+            timetable (TimeTable): The timetable to collect the lesson times of.
+        Returns:
+            list: LessonTimes objects of the timetable, in the order of its courses and lessons.
+        """
+        if not timetable or not timetable.courses:
             return []
         # Collect all lesson times from the timetable's courses
         lesson_times = []
-        for course in self.timetable.courses:
-            if course.code.startswith("BLOCKED"):
-                continue  # Skip dummy time constraints
-            
+        for course in timetable.courses:
             for lesson_list in [course.lectures, course.exercises, course.labs, course.departmentHours,
                                 course.reinforcement, course.training]:
                 if not lesson_list:
@@ -67,13 +162,26 @@ class TimetableMetricsService:
                 for lesson in lesson_list:
                     lesson_times.append(lesson.time)
         
+        return lesson_times
+
+    # Method to group lesson times by day.
+    def group_lesson_times(self, lesson_times):
+        """
+        Group lesson times by day.
+
+        Args:
+            lesson_times (list): LessonTimes objects of a timetable.
+        Returns:
+            defaultdict: A dictionary where keys are (active) days of the week,
+                and values are lists of LessonTimes objects for that day, sorted by start hour.
+        """
         # Group lesson times by day
         lessons_by_day = defaultdict(list)
         for lesson_time in lesson_times:
             lessons_by_day[lesson_time.day].append(lesson_time)
         # Sort lessons by start hour for each day
         for day, lessons in lessons_by_day.items():
-            lessons.sort(key=lambda lt: self.extract_hour(lt.start_hour))
+            lessons.sort(key=lambda lt: lt.start_time)
         
         return lessons_by_day
     
@@ -107,20 +215,17 @@ class TimetableMetricsService:
             tuple: (free_windows, total_free_hours)
         """
         free_windows = 0
-        total_free_hours = 0
+        total_free_minutes = 0
         for lessons in lesson_times.values():
             # Check for gaps between lessons
             for i in range(len(lessons) - 1):
-                current_end = self.extract_hour(lessons[i].end_hour)
-                next_start = self.extract_hour(lessons[i + 1].start_hour)
-                
-                gap = next_start - current_end
+                gap = lessons[i + 1].start_time - lessons[i].end_time
                 if gap > 0:
                     free_windows += 1
-                    total_free_hours += gap
+                    total_free_minutes += gap
               
         
-        return free_windows, total_free_hours
+        return free_windows, LessonTimes.to_hours(total_free_minutes)
     
     ####DEBUGGING METHODS - Uncomment to use for debugging purposes#####
     # def calculate_avg_times(self, lesson_times=None):
@@ -205,11 +310,11 @@ class TimetableMetricsService:
         # for each day, add the start and end times of lessons to the totals
         for daily_lessons in lesson_times.values():
             last_lesson_index = len(daily_lessons) - 1
-            total_start += self.extract_hour(daily_lessons[0].start_hour) 
-            total_end += self.extract_hour(daily_lessons[last_lesson_index].end_hour)
-        # Calculate the average start and end times
-        avg_start = total_start / total_days
-        avg_end = total_end / total_days
+            total_start += daily_lessons[0].start_time
+            total_end += daily_lessons[last_lesson_index].end_time
+        # Calculate the average start and end times (in hours)
+        avg_start = total_start / (MINUTES_PER_HOUR * total_days)
+        avg_end = total_end / (MINUTES_PER_HOUR * total_days)
         
         return avg_start, avg_end
     
@@ -93,10 +93,6 @@ class TxtManager(FileManager):
                                 raise ValueError("Day must be between 1 and 7.")
 
                             # נניח ש-start ו-end הם מחרוזות בפורמט "HH:MM"
-                            # נחלץ רק את השעה (HH) מתוך המחרוזת
-                            start_hour = start.split(':')[0]
-                            end_hour = end.split(':')[0]
-                              
                             # המרת השעות למבני datetime לצורך בדיקות השוואה
                             start_time = datetime.strptime(start, "%H:%M")
                             end_time = datetime.strptime(end, "%H:%M")
@@ -108,13 +104,12 @@ class TxtManager(FileManager):
                             if not (earliest <= start_time < end_time <= latest):
                                 raise ValueError("Time must be between 08:00 and 21:00, and start < end.")
 
-                            # אם כל הבדיקות עברו, צור את האובייקט LessonTimes עם השעות כמחרוזות HH בלבד
-                            lessonTimes = LessonTimes(int(start_hour), int(end_hour), day)
+                            # אם כל הבדיקות עברו, צור את האובייקט LessonTimes עם השעות המלאות (HH:MM)
+                            lessonTimes = LessonTimes(start, end, day)
                         except ValueError as e:
                             errors.append(ValidationError(f"Invalid time slot data in course '{name}': {e} --> '{time_slot}'"))
                             continue
                         
-                        lessonTimes = LessonTimes(int(start_hour), int(end_hour), day)  # Create a new lesson times object
                         lesson = Lesson(lessonTimes, lessonType, building, room)  # Create a new lesson object
                         # Store in the correct category
                         if lessonType == "L":
@@ -29,7 +29,7 @@ class LessonSelectionDialog(QDialog):
 
         for lesson in alternatives:
             day_str = DAY_NAMES.get(lesson.time.day, f"Day {lesson.time.day}")
-            info = f"{lesson.lesson_type.capitalize()} | {day_str} {lesson.time.start_hour}:00–{lesson.time.end_hour}:00 | Group {lesson.groupCode}"
+            info = f"{lesson.lesson_type.capitalize()} | {day_str} {lesson.time.format_time(lesson.time.start_time)}–{lesson.time.format_time(lesson.time.end_time)} | Group {lesson.groupCode}"
             button = QPushButton(info)
             button.clicked.connect(lambda checked, l=lesson: self.select_lesson(l))
             scroll_layout.addWidget(button)
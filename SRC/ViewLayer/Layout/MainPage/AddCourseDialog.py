@@ -290,7 +290,7 @@ class AddCourseDialog(QDialog):
         """Update the lessons list display"""
         self.lessons_list_widget.clear()
         for lesson in self.lessons_list:
-            lesson_text = f"{lesson.lesson_type.title()} - Day {lesson.time.day}, {lesson.time.start_hour:02d}:00-{lesson.time.end_hour:02d}:00"
+            lesson_text = f"{lesson.lesson_type.title()} - Day {lesson.time.day}, {lesson.time.format_time(lesson.time.start_time)}-{lesson.time.format_time(lesson.time.end_time)}"
             if lesson.building or lesson.room:
                 lesson_text += f" ({lesson.building}-{lesson.room})"
             self.lessons_list_widget.addItem(lesson_text)
@@ -67,8 +67,8 @@ class LessonWidget(QFrame):
         time_label = QLabel("Time:")
         time_label.setStyleSheet("font-weight: bold; color: #555;")
         
-        start_time = f"{self.lesson.time.start_hour:02d}:00"
-        end_time = f"{self.lesson.time.end_hour:02d}:00"
+        start_time = self.lesson.time.format_time(self.lesson.time.start_time)
+        end_time = self.lesson.time.format_time(self.lesson.time.end_time)
         
         # Hebrew day names
         days = {
@@ -1,19 +1,10 @@
 from PyQt5.QtWidgets import QWidget, QToolButton, QMenu, QAction, QActionGroup, QHBoxLayout
 from PyQt5.QtCore import Qt
 from SRC.ViewLayer.Theme.ModernUIQt5 import ModernUIQt5
+from SRC.Services.MetricsRegistry import MetricsRegistry
 
 class PreferencesDropdown(QWidget):
     
-    # Mapping of visible labels to actual internal preference keys
-    PREFERENCES_OPTIONS = {
-        "None": "None",
-        "Active Days": "active_days",
-        "Free windows": "free_windows_number",
-        "Total free windows": "free_windows_sum",
-        "Average Start Time": "average_start_time",
-        "Average End Time": "average_end_time",
-    }
-    
     # Define sorting orders with boolean values
     ORDER_OPTIONS = {
         "Ascending": True,
@@ -25,6 +16,12 @@ class PreferencesDropdown(QWidget):
         self.callback = callback # A function that will be called when a selection changes
         self.current_order = "Ascending"
         self.current_preference = "None"
+        # Mapping of visible labels to actual internal preference keys -
+        # every metric registered by the time the dropdown is created
+        self.preferences_options = {
+            "None": "None",
+            **MetricsRegistry.get_labels(),
+        }
     
         # Set layout for the whole dropdown component
         layout = QHBoxLayout()
@@ -48,7 +45,7 @@ class PreferencesDropdown(QWidget):
         self.pref_group.setExclusive(True) # Only one can be selected at a time
         
         # Create each preference option in the menu
-        for label, value in self.PREFERENCES_OPTIONS.items():
+        for label, value in self.preferences_options.items():
             action = QAction(label, self.menu, checkable=True)
             action.setData(value) # Store internal value (not the visible label)
             if value == "None":  # Default selection
@@ -375,8 +375,8 @@ class CourseDetailsPanelQt5(QWidget):
         # Time (day and hours)
         if hasattr(lesson, 'time') and lesson.time:
             time_label = QLabel("Time:")
-            start_time = f"{lesson.time.start_hour:02d}:00"
-            end_time = f"{lesson.time.end_hour:02d}:00"
+            start_time = lesson.time.format_time(lesson.time.start_time)
+            end_time = lesson.time.format_time(lesson.time.end_time)
 
             # Translate day numbers to Hebrew day names
             days = {
@@ -44,7 +44,7 @@ DAYS = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Satur
 HOURS = list(range(8, 22))  # 8:00 to 21:00
 
 
-def map_courses_to_slots(data, course_lookup=None):
+def map_courses_to_slots(data, course_lookup=None, blocks=None):
     """
     Maps each lesson to its time slots:
     - If data is a Timetable (has `.courses`), maps its courses.
@@ -52,10 +52,15 @@ def map_courses_to_slots(data, course_lookup=None):
     
     :param data: Timetable object or list of (course_id, Lesson)
     :param course_lookup: dict mapping course_id to Course (required if data is list of tuples)
+    :param blocks: dummy courses of the time constraints, shown as blocked slots (not part of the timetables)
     :return: dict of {(day, hour): lesson_info}
     """
     slot_map = {}
 
+    for block in blocks or []:
+        for lesson in block.lectures:
+            _map_lesson(slot_map, block.name, block.code, lesson.lesson_type, lesson)
+
     # Determine input type
     if hasattr(data, "courses"):
         # Case 1: Timetable object with full course info
@@ -94,7 +99,7 @@ def _map_lesson(slot_map, course_name, course_code, lesson_type, lesson):
 
     day = DAYS[day_index - 1]
     start = lesson.time.start_hour
-    end = lesson.time.end_hour
+    end = lesson.time.slot_end_hour
 
     for hour in range(start, end):
         slot_map[(day, hour)] = {
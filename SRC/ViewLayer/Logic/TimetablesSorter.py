@@ -1,93 +1,197 @@
-from bisect import insort, bisect_left
-from collections import defaultdict
+import heapq
+from bisect import bisect_right
+from itertools import accumulate, count
+from SRC.Services.MetricsRegistry import MetricsRegistry
+
+DISPLAY_TOP_N = 100  # How many of the best timetables a sorted view keeps in order as batches arrive
 
 class TimetablesSorter:
     """
     A class to sort timetables based on various metrics.
-    It caches sorted lists to improve performance on repeated sort requests.
+    It caches a sorted view per (key, order), so repeated sort requests only merge the timetables added since.
     This class allows sorting timetables by different keys and in both ascending and descending order.
     It also provides a method to add new timetables and update the sorted cache accordingly.
     """
-    def __init__(self):
-        self.sorted_schedules_cache = dict()  # key: (metric_key, ascending) -> sorted list
-    
+    def __init__(self, top_n: int = DISPLAY_TOP_N):
+        self.top_n = top_n
+        self.sorted_schedules_cache = dict()  # key: (metric_key, ascending) -> SortedTimetablesView
+
     def sort_timetables_by_key(self, all_schedules, key, ascending):
-        """ 
+        """
         Sorts the provided list of timetables by a specified key and order.
-        If the sorted list for the given key and order is already cached, it returns the cached list.
-        
-        :param all_schedules: List of timetable objects to be sorted.
-        :param key: The attribute of the timetable metrics to sort by.
+        If a sorted view for the given key and order is already cached, only the timetables added
+        to the list since it was last sorted are merged into it.
+
+        :param all_schedules: List of timetable objects to be sorted (timetables are only ever appended to it).
+        :param key: The name of the metric to sort by (see MetricsRegistry).
         :param ascending: Boolean indicating whether to sort in ascending order (True) or descending order (False).
-        
-        :return: A sorted list of timetables.
+
+        :return: A sorted view of the timetables (indexable like a list).
         """
         cache_key = (key, ascending)
-        
-        if cache_key in self.sorted_schedules_cache:
-            sorted_schedules = self.sorted_schedules_cache[cache_key]
-            # Check if the cached sorted list contains all schedules
-            if len(sorted_schedules) == len(all_schedules):
-                return sorted_schedules
-        # If the cache does not contain the key or has only partial sorted list, sort the schedules
-        sorted_list = sorted(all_schedules, key=lambda t: getattr(t.metrics, key), reverse=not ascending)
-        self.sorted_schedules_cache[cache_key] = sorted_list
-        return sorted_list
-    
+
+        sorted_view = self.sorted_schedules_cache.get(cache_key)
+        if sorted_view is None or len(sorted_view) > len(all_schedules):
+            sorted_view = SortedTimetablesView(key, ascending, self.top_n)
+            self.sorted_schedules_cache[cache_key] = sorted_view
+        # Merge only the timetables the view has not seen yet
+        sorted_view.merge(all_schedules[len(sorted_view):])
+        return sorted_view
+
     def get_current_sort_key(self, list_of_timetables):
         """
         Returns a tuple (key, ascending) of the provided list of timetables.
-        Finds the list in the dictionary of sorted schedules cache that matches the provided list.
-        :param list_of_timetables: List of timetable objects to check.
+        Finds the sorted view in the dictionary of sorted schedules cache that matches the provided list.
+        :param list_of_timetables: A sorted view returned by sort_timetables_by_key.
         :return: A tuple (key, ascending) if found, otherwise None.
         """
-        for (key, ascending), sorted_list in self.sorted_schedules_cache.items():
-            if sorted_list == list_of_timetables:
+        for (key, ascending), sorted_view in self.sorted_schedules_cache.items():
+            if sorted_view is list_of_timetables:
                 return (key, ascending)
         return None
-    
+
     def add_timetables(self, timetable_batch):
         """
         Adds a new timetable batch to the sorter and updates the sorted cache.
-        
+
         :param timetable_batch: The timetable_batch object to add.
-        
+
         """
-        for (key, ascending) in self.sorted_schedules_cache.keys():
-            for timetable in timetable_batch:
-                # Insert the timetable into the sorted cache for the given key and order
-                if ascending:
-                    # Use insort to maintain ascending order
-                    insort(self.sorted_schedules_cache[(key, ascending)], timetable,
-                           key=lambda t: getattr(t.metrics, key))
-                else:
-                    # Use a custom insort to maintain descending order
-                    insort_descending(self.sorted_schedules_cache[(key, ascending)], timetable,
-                                      key=lambda t: getattr(t.metrics, key))
-        
-def insort_descending(sorted_list, new_item, key=lambda item: item):
+        for sorted_view in self.sorted_schedules_cache.values():
+            sorted_view.merge(timetable_batch)
+
+
+class SortedTimetablesView:
+    """
+    Timetables sorted by a metric, indexable like a list.
+    Only the top N are kept in order as batches arrive - in a heap of N entries, so merging a batch
+    costs O(batch * log N) instead of re-sorting everything.
+    The full order is built only when an index past the top N is asked for, into a SortedKeyList
+    that later batches are then inserted into one by one.
+    Ties keep the order the timetables were added in (like sorted()).
     """
-    Inserts a new_item into sorted_list while maintaining descending order,
-    using the given key function for comparison.
+    def __init__(self, key: str, ascending: bool, top_n: int = DISPLAY_TOP_N):
+        self.key = key
+        self.ascending = ascending
+        self.top_n = top_n
+        self._counter = count()  # Insertion order, to break ties
+        self._size = 0
+        self._heap = []  # The top N entries with negated sort keys (a max-heap of the kept entries)
+        self._top = None  # The top N timetables in order, built on demand
+        self._pending = []  # (sort key, timetable) of the timetables added before the full order was built
+        self._sorted = None  # SortedKeyList of all the timetables, built on demand
 
-    :param sorted_list: List that is already sorted in descending order.
-    :param new_item: The item to insert.
-    :param key: A function that extracts a comparison key from each item.
-                By default, the item itself is used.
+    def merge(self, timetable_batch):
+        """Adds a batch of timetables to the view"""
+        for timetable in timetable_batch:
+            value = MetricsRegistry.get_value(timetable, self.key)
+            sort_key = (value if self.ascending else -value, next(self._counter))
+            self._size += 1
+            if self._sorted is None:
+                self._pending.append((sort_key, timetable))
+            else:
+                self._sorted.add(sort_key, timetable)
+
+            heap_entry = (-sort_key[0], -sort_key[1], timetable)
+            if len(self._heap) < self.top_n:
+                heapq.heappush(self._heap, heap_entry)
+                self._top = None
+            elif heap_entry > self._heap[0]:
+                # Better than the worst of the top N - it takes its place
+                heapq.heapreplace(self._heap, heap_entry)
+                self._top = None
+
+    def _get_top(self) -> list:
+        """Returns the top N timetables in order"""
+        if self._top is None:
+            self._top = [timetable for _, _, timetable in sorted(self._heap, reverse=True)]
+        return self._top
+
+    def _get_all(self):
+        """Returns all the timetables in order, building the full order on first use"""
+        if self._sorted is None:
+            self._sorted = SortedKeyList(self._pending)
+            self._pending = []
+        return self._sorted
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("sorted view index out of range")
+        if index < len(self._heap):
+            return self._get_top()[index]
+        return self._get_all()[index]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class SortedKeyList:
+    """
+    Items kept in the order of their (cached) keys, in sublists of up to 2 * load items
+    (the layout of sortedcontainers.SortedKeyList).
+    Adding an item bisects the last keys of the sublists and then one sublist, so it only shifts
+    up to 2 * load items instead of the whole list. An index is found by bisecting the start
+    positions of the sublists, which are rebuilt only when an index is asked for after an add.
     """
+    DEFAULT_LOAD = 1000
+
+    def __init__(self, pairs=(), load: int = DEFAULT_LOAD):
+        """
+        :param pairs: (key, item) pairs to start with, in any order.
+        :param load: The size sublists are built with (they are split in half when they reach twice that).
+        """
+        self._load = load
+        pairs = sorted(pairs, key=lambda pair: pair[0])
+        self._keys = [[key for key, _ in pairs[i:i + load]] for i in range(0, len(pairs), load)]
+        self._items = [[item for _, item in pairs[i:i + load]] for i in range(0, len(pairs), load)]
+        self._maxes = [keys[-1] for keys in self._keys]  # The last key of every sublist
+        self._offsets = None  # The index every sublist starts at, built on demand
+        self._len = len(pairs)
+
+    def add(self, key, item):
+        """Inserts an item after the ones with keys less than or equal to its key"""
+        self._len += 1
+        self._offsets = None
+        if not self._maxes:
+            self._keys.append([key])
+            self._items.append([item])
+            self._maxes.append(key)
+            return
 
-    # Extract the comparison key for the new item.
-    new_key = key(new_item)
+        position = min(bisect_right(self._maxes, key), len(self._maxes) - 1)
+        keys, items = self._keys[position], self._items[position]
+        index = bisect_right(keys, key)
+        keys.insert(index, key)
+        items.insert(index, item)
+        self._maxes[position] = keys[-1]
 
-    # Build a list of keys for all items currently in the list.
-    # Negate the keys to simulate descending order using bisect_left,
-    # which only works with ascending sequences.
-    keys = [-key(item) for item in sorted_list]
+        if len(keys) >= 2 * self._load:
+            # Split the sublist in half
+            self._keys[position:position + 1] = [keys[:self._load], keys[self._load:]]
+            self._items[position:position + 1] = [items[:self._load], items[self._load:]]
+            self._maxes.insert(position, keys[self._load - 1])
 
-    # Find the position where the new item should be inserted
-    # to maintain descending order.
-    index = bisect_left(keys, -new_key)
+    def __len__(self):
+        return self._len
 
-    # Insert the new item into the correct position.
-    sorted_list.insert(index, new_item)
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("sorted list index out of range")
+        if self._offsets is None:
+            self._offsets = [0, *accumulate(len(keys) for keys in self._keys[:-1])]
+        position = bisect_right(self._offsets, index) - 1
+        return self._items[position][index - self._offsets[position]]
 
+    def __iter__(self):
+        for items in self._items:
+            yield from items
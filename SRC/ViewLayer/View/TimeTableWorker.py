@@ -1,4 +1,5 @@
 from PyQt5.QtCore import QThread, pyqtSignal
+import threading
 import time
 
 class TimetableWorker(QThread):
@@ -9,54 +10,87 @@ class TimetableWorker(QThread):
 
     # These are "signals" that the thread can send to the main program (the GUI)
     new_options_available = pyqtSignal(list)  # Sends a list of new timetables
-    loading_progress = pyqtSignal(int, int)   # Tells how many have loaded so far (current, total)
+    loading_progress = pyqtSignal(object, object)  # Tells how many have loaded so far (current, total - can exceed a C int)
     loading_finished = pyqtSignal()           # Says "we're done loading!"
     error_occurred = pyqtSignal(str)          # Sends an error message if something goes wrong
+    conflict_found = pyqtSignal(list, bool)   # Courses that cannot be taken together (and if the time constraints are involved)
 
-    def __init__(self, controller, file_path2, batch_size=50):
+    def __init__(self, controller, file_path2, batch_size=50, workers=None):
         super().__init__()
         self.controller = controller          # The logic/controller part of your app
                    # Path to the first input file
         self.file_path2 = file_path2          # Path to the second input file
         self.batch_size = batch_size          # How many results to send at a time
+        self.workers = workers                # How many processes search the timetables (None = this thread only)
         self._stop_requested = False          # If True, the thread should stop
         self._paused = False                  # If True, the thread should pause
+        self._done = False                    # If True, the loading ended and a late count is dropped
         self.loaded_count = 0                 # How many timetables were loaded so far
+        self.total_count = 0                  # How many timetables there are (0 until they are counted)
+        self.courses = None                   # The selected courses, loaded once per run
 
     def run(self):
         """This is what runs when you start the thread."""
         try:
+            # Load the selection once, so the check, the search and the count all use the same courses
+            self.courses = self.controller.load_selection(None, self.file_path2)
+
+            # Quickly check that there are timetables at all, instead of searching the whole tree for nothing
+            conflicting, constraints_involved = self.controller.find_conflicting_courses(
+                None, self.file_path2, courses=self.courses
+            )
+            if conflicting:
+                self.conflict_found.emit(conflicting, constraints_involved)
+                self.loading_progress.emit(0, 0)
+                self.loading_finished.emit()
+                return
+
             # Get a generator that gives us batches of timetables
             batch_generator = self.controller.get_all_options(None,
                 self.file_path2, 
-                batch_size=self.batch_size
+                batch_size=self.batch_size,
+                workers=self.workers,
+                courses=self.courses
             )
 
-            batch_count = 0
-            for batch in batch_generator:
-                # Stop the thread if requested
-                if self._stop_requested:
-                    break
-
-                # Wait here if paused
-                while self._paused and not self._stop_requested:
-                    self.msleep(100)  # Wait 100ms before checking again
-
-                if self._stop_requested:
-                    break
+            self.loading_progress.emit(0, self.total_count)
 
-                if batch:  # If the batch is not empty
-                    self.loaded_count += len(batch)
-                    batch_count += 1
-
-                    # Let the GUI know we got new data
-                    self.new_options_available.emit(batch)
-
-                    # Let the GUI know how much we've done
-                    self.loading_progress.emit(self.loaded_count, -1)  # -1 means we don't know total
-
-                    # Small sleep so the GUI doesn’t freeze
-                    self.msleep(10)
+            batch_count = 0
+            try:
+                for batch in batch_generator:
+                    # Stop the thread if requested
+                    if self._stop_requested:
+                        break
+
+                    # Wait here if paused
+                    while self._paused and not self._stop_requested:
+                        self.msleep(100)  # Wait 100ms before checking again
+
+                    if self._stop_requested:
+                        break
+
+                    if batch:  # If the batch is not empty
+                        self.loaded_count += len(batch)
+                        batch_count += 1
+
+                        # Let the GUI know we got new data
+                        self.new_options_available.emit(batch)
+
+                        # Count the timetables once the first batch is shown, so the GUI can show a real progress bar.
+                        # The count can take longer than finding the first timetables, so it runs in its own thread
+                        # and the loading (and stopping it) never waits for it
+                        if batch_count == 1:
+                            threading.Thread(target=self._count_options, daemon=True).start()
+
+                        # Let the GUI know how much we've done
+                        self.loading_progress.emit(self.loaded_count, self.total_count)
+
+                        # Small sleep so the GUI doesn’t freeze
+                        self.msleep(10)
+            finally:
+                # Closed right away, so the timetables found so far are stored in the cache on this thread
+                # (not whenever the generator is garbage-collected)
+                batch_generator.close()
 
             # If we finished normally (no stop requested), tell the GUI we’re done
             if not self._stop_requested:
@@ -65,6 +99,19 @@ class TimetableWorker(QThread):
         except Exception as e:
             # If an error happened, let the GUI know
             self.error_occurred.emit(str(e))
+        finally:
+            self._done = True
+
+    def _count_options(self):
+        """Counts the timetables (in its own thread) and reports the total, unless the loading was stopped."""
+        try:
+            total = self.controller.count_options(None, self.file_path2, courses=self.courses)
+        except Exception as e:
+            print(f"Error counting the timetables: {str(e)}")  # The progress just stays without a total
+            return
+        if not self._stop_requested and not self._done:
+            self.total_count = total
+            self.loading_progress.emit(self.loaded_count, total)
 
     def stop(self):
         """Call this if you want to stop the thread."""
@@ -33,6 +33,9 @@ from SRC.ViewLayer.Layout.TimetablesUIComponents import TimetableUIComponents
 from SRC.ViewLayer.Logic.Pdf_Exporter_System import ScreenshotPDFExporter
 from SRC.ViewLayer.Logic.GoogleExporter import export_timetable_to_google_calendar
 
+PROGRESS_BAR_LIMIT = 2 ** 31 - 1  # The largest value a QProgressBar takes (a C int)
+PROGRESS_BAR_SCALE = 10000  # Steps of the progress bar when there are more timetables than that
+
 class TimetablesPageQt5(QMainWindow):
     """
     Main Timetables Page UI class for sequentially displaying timetable options.
@@ -52,6 +55,7 @@ class TimetablesPageQt5(QMainWindow):
         self.all_options = []  # All generated timetables
         self.current_index = 0  # Current timetable index being shown
         self.loading_complete = False  # Flag to indicate loading completion
+        self.conflict_message = None  # Why there are no timetables, when a conflict was found
         self.total_expected = 0  # Total number of expected timetables
         self.timetables_sorter = TimetablesSorter()  # Timetable sorting utility
         self.sorted_timetables = []  # Sorted timetable cache
@@ -299,6 +303,7 @@ class TimetablesPageQt5(QMainWindow):
             self.worker.loading_progress.connect(self.on_loading_progress)
             self.worker.loading_finished.connect(self.on_loading_finished)
             self.worker.error_occurred.connect(self.on_loading_error)
+            self.worker.conflict_found.connect(self.on_conflict_found)
             
             self.worker.start()
             self.is_loading = True
@@ -361,9 +366,16 @@ class TimetablesPageQt5(QMainWindow):
     def on_loading_progress(self, current, total):
         """Update progress bar and rate of timetable generation"""
         if total > 0:
-            self.total_expected = total
-            self.progress_bar.setMaximum(total)
-            self.progress_bar.setValue(current)
+            if self.total_expected != total:
+                self.total_expected = total
+                self.update_title()
+            if total <= PROGRESS_BAR_LIMIT:
+                self.progress_bar.setMaximum(total)
+                self.progress_bar.setValue(current)
+            else:
+                # The progress bar only takes C ints - show the fraction loaded instead
+                self.progress_bar.setMaximum(PROGRESS_BAR_SCALE)
+                self.progress_bar.setValue(current * PROGRESS_BAR_SCALE // total)
             self.progress_bar.setVisible(True)
             self.progress_label.setText(f"{current} of {total} options loaded")
         else:
@@ -392,7 +404,10 @@ class TimetablesPageQt5(QMainWindow):
         self.update_title()
         if not self.all_options:
             # Show message when no timetables were loaded
-            self.no_data_label.setText("No timetable options found.\nPlease go back and select different courses.")
+            if self.conflict_message:
+                self.no_data_label.setText(self.conflict_message)
+            else:
+                self.no_data_label.setText("No timetable options found.\nPlease go back and select different courses.")
             self.no_data_label.show()
             self.status_label.setText("No timetables found")
         else:
@@ -402,6 +417,13 @@ class TimetablesPageQt5(QMainWindow):
             if self.auto_display_enabled and not self.display_timer.isActive():
                 self.display_timer.start(self.display_interval)
                 
+    def on_conflict_found(self, course_codes, constraints_involved):
+        """Explain which courses (and time constraints) cannot be taken together"""
+        message = "No timetable options found.\nThese courses cannot be taken together: " + ", ".join(course_codes)
+        if constraints_involved:
+            message += "\n(together with your time constraints)"
+        self.conflict_message = message + "\nPlease go back and select different courses."
+
     def on_loading_error(self, error_message):
         """Handle loading errors with a popup message"""
         QMessageBox.critical(self, "Loading Error", f"Error loading timetables:\n{error_message}")
@@ -476,8 +498,10 @@ class TimetablesPageQt5(QMainWindow):
         else:
             current_timetable_courses = self.all_options[self.current_index]
 
-        # Convert course data to slot-based map
-        slot_map = map_courses_to_slots(current_timetable_courses)
+        # Convert course data to slot-based map, with the blocked time constraints
+        slot_map = map_courses_to_slots(
+            current_timetable_courses, blocks=self.controller.get_time_constraint_blocks()
+        )
 
         # Clear previous timetable widgets
         for i in reversed(range(self.timetable_layout.count())):
@@ -512,6 +536,9 @@ class TimetablesPageQt5(QMainWindow):
             self.title_label.setText("No timetable options available")
         elif self.loading_complete:
             self.title_label.setText(f"Timetable Option {self.current_index + 1} of {len(self.all_options)}")
+        elif self.total_expected > 0:
+            remaining_text = f" loaded, {self.total_expected} in total (Loading...)" if self.is_loading else ""
+            self.title_label.setText(f"Timetable Option {self.current_index + 1} of {len(self.all_options)}{remaining_text}")
         else:
             remaining_text = f"+ (Loading...)" if self.is_loading else ""
             self.title_label.setText(f"Timetable Option {self.current_index + 1} of {len(self.all_options)}{remaining_text}")
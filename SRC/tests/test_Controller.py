@@ -7,6 +7,21 @@ import time
 
 service = ScheduleService()
 
+def _make_courses(count, lecture_days, exercise_days):
+    """Courses with three 2-hour lecture groups and two 1-hour exercise groups, spread over the week by their index"""
+    return [
+        Course(
+            name=f"Course{i+1}",
+            code=f"{i+1}{i+1}{i+1}{i+1}{i+1}",
+            lectures=[Lesson(LessonTimes(8 + 2 * j, 10 + 2 * j, 1 + (i + j) % lecture_days), "L", "A", f"{i}{j}")
+                      for j in range(3)],
+            exercises=[Lesson(LessonTimes(14 + j, 15 + j, 1 + (i * j) % exercise_days), "T", "A", f"{i}{j + 5}")
+                       for j in range(2)],
+            labs=[]
+        )
+        for i in range(count)
+    ]
+
 def test_generate_all_possible_schedules():
     course1 = Course(
         name="Course1",
@@ -204,4 +219,811 @@ def test_schedule_performance():
     duration = time.time() - start_time
 
     assert duration < 10
-    assert len(schedules) == 1000
\ No newline at end of file
+    assert len(schedules) == 1000
+
+def test_schedule_conflicts_with_integer_hours():
+    course1 = Course(
+        name="Course1",
+        code="11111",
+        lectures=[
+            Lesson(LessonTimes(8, 11, 2), "L", "A", "101")
+        ],
+        exercises=[
+            Lesson(LessonTimes(11, 12, 2), "T", "A", "102")
+        ],
+        labs=[]
+    )
+
+    course2 = Course(
+        name="Course2",
+        code="22222",
+        lectures=[
+            Lesson(LessonTimes(10, 11, 2), "L", "B", "201"),
+            Lesson(LessonTimes(10, 11, 3), "L", "B", "202")
+        ],
+        exercises=[
+            Lesson(LessonTimes("12:00", "13:00", "2"), "T", "B", "203")
+        ],
+        labs=[]
+    )
+
+    schedules = service.generate_schedules([course1, course2])
+    assert len(schedules) == 1
+    assert schedules[0].courses[1].lectures[0].room == "202"
+
+def test_schedule_forward_checking_prunes_dead_branches():
+    course1 = Course(
+        name="Course1",
+        code="11111",
+        lectures=[
+            Lesson(LessonTimes(8, 10, 1), "L", "A", "101"),
+            Lesson(LessonTimes(10, 12, 1), "L", "A", "102")
+        ],
+        exercises=[
+            Lesson(LessonTimes(14, 15, 1), "T", "A", "103"),
+            Lesson(LessonTimes(15, 16, 1), "T", "A", "104")
+        ],
+        labs=[]
+    )
+
+    course2 = Course(
+        name="Course2",
+        code="22222",
+        lectures=[
+            Lesson(LessonTimes(8, 10, 2), "L", "B", "201")
+        ],
+        exercises=[
+            Lesson(LessonTimes(10, 12, 2), "T", "B", "202")
+        ],
+        labs=[]
+    )
+
+    course3 = Course(
+        name="Course3",
+        code="33333",
+        lectures=[
+            Lesson(LessonTimes(10, 11, 1), "L", "C", "301")
+        ],
+        exercises=[
+            Lesson(LessonTimes(12, 13, 1), "T", "C", "302")
+        ],
+        labs=[]
+    )
+
+    search_space = service._build_search_space([course1, course2, course3])
+    # Only the combinations with the 8:00 lecture of course1 fit with course3
+    assert search_space.compatibility[2][0][0] == 0b0011
+
+    schedules = service.generate_schedules([course1, course2, course3])
+    assert len(schedules) == 2
+    assert all(t.courses[0].lectures[0].room == "101" for t in schedules)
+
+def test_schedule_orderings_keep_original_course_order():
+    courses = []
+    for i in range(4):
+        courses.append(Course(
+            name=f"Course{i+1}",
+            code=f"{i+1}{i+1}{i+1}{i+1}{i+1}",
+            lectures=[Lesson(LessonTimes(8 + j, 9 + j, 1 + j % 2), "L", "A", f"{i}{j}") for j in range(i + 1)],
+            exercises=[Lesson(LessonTimes(12 + i, 13 + i, 3), "T", "A", f"{i}9")],
+            labs=[]
+        ))
+
+    def layout(timetable):
+        return tuple(course.lectures[0].room for course in timetable.courses)
+
+    expected = sorted(layout(t) for t in service.generate_schedules(courses))
+    assert expected
+    for ordering in ScheduleService.ORDERINGS:
+        schedules = service.generate_schedules(courses, ordering=ordering)
+        assert [c.code for c in schedules[0].courses] == [c.code for c in courses]
+        assert sorted(layout(t) for t in schedules) == expected
+
+def test_schedule_unsupported_ordering():
+    with pytest.raises(ValueError):
+        service.generate_schedules([], ordering="random")
+
+def test_schedule_parallel_generation_matches_serial():
+    courses = []
+    for i in range(4):
+        courses.append(Course(
+            name=f"Course{i+1}",
+            code=f"{i+1}{i+1}{i+1}{i+1}{i+1}",
+            lectures=[Lesson(LessonTimes(8 + j, 9 + j, i + 1), "L", "A", f"{i}{j}") for j in range(3)],
+            exercises=[Lesson(LessonTimes(12 + j, 13 + j, i + 1), "T", "A", f"{i}{j + 5}") for j in range(2)],
+            labs=[]
+        ))
+
+    def layout(timetable):
+        return tuple((c.lectures[0].room, c.exercises[0].room) for c in timetable.courses)
+
+    serial = [layout(t) for t in service.generate_schedules_progressive(courses)]
+    parallel = [layout(t) for t in service.generate_schedules_progressive(courses, workers=2, split_depth=2)]
+    unordered = [layout(t) for t in service.generate_schedules_progressive(courses, workers=2, deterministic=False)]
+
+    assert len(serial) == 6 ** 4
+    assert parallel == serial
+    assert sorted(unordered) == sorted(serial)
+
+def test_generate_best_matches_full_sort():
+    courses = _make_courses(4, lecture_days=4, exercise_days=5)
+
+    all_schedules = service.generate_schedules(courses, limit=100000)
+    for key in ScheduleService.METRIC_KEYS:
+        for ascending in (True, False):
+            best = service.generate_best(courses, key, k=5, ascending=ascending)
+            expected = sorted(all_schedules, key=lambda t: getattr(t.metrics, key), reverse=not ascending)[:5]
+            assert [getattr(t.metrics, key) for t in best] == [getattr(t.metrics, key) for t in expected]
+
+def test_generate_best_unsupported_metric():
+    with pytest.raises(ValueError):
+        service.generate_best([], "rooms", k=5)
+
+def test_count_schedules_matches_generation():
+    courses = []
+    for i in range(5):
+        courses.append(Course(
+            name=f"Course{i+1}",
+            code=f"{i+1}{i+1}{i+1}{i+1}{i+1}",
+            lectures=[Lesson(LessonTimes(8 + j, 10 + j, 1 + (i + j) % 3), "L", "A", f"{i}{j}") for j in range(4)],
+            exercises=[Lesson(LessonTimes(12 + j, 13 + j, 1 + (i * j) % 4), "T", "A", f"{i}{j + 5}") for j in range(3)],
+            labs=[]
+        ))
+
+    generated = sum(1 for _ in service.generate_schedules_progressive(courses))
+    assert service.count_schedules(courses) == generated
+    assert service.count_schedules([]) == 0
+
+def test_schedule_collapse_equivalent_groups():
+    course1 = Course(
+        name="Course1",
+        code="11111",
+        lectures=[
+            Lesson(LessonTimes(8, 10, 1), "L", "A", "101"),
+            Lesson(LessonTimes(8, 10, 1), "L", "B", "102"),
+            Lesson(LessonTimes(10, 12, 1), "L", "A", "103")
+        ],
+        exercises=[
+            Lesson(LessonTimes(12, 13, 1), "T", "A", "104"),
+            Lesson(LessonTimes(12, 13, 1), "T", "C", "105")
+        ],
+        labs=[]
+    )
+
+    course2 = Course(
+        name="Course2",
+        code="22222",
+        lectures=[
+            Lesson(LessonTimes(8, 10, 2), "L", "B", "201")
+        ],
+        exercises=[
+            Lesson(LessonTimes(10, 11, 2), "T", "B", "202")
+        ],
+        labs=[]
+    )
+
+    def layout(timetable):
+        return tuple((c.lectures[0].room, c.exercises[0].room) for c in timetable.courses)
+
+    collapsed = list(service.generate_schedules_progressive([course1, course2], collapse_equivalent=True))
+    assert len(collapsed) == 2
+    assert [t.alternatives_count for t in collapsed] == [4, 2]
+
+    expanded = list(service.generate_schedules_progressive([course1, course2], collapse_equivalent=True, expand_equivalent=True))
+    regular = service.generate_schedules([course1, course2])
+    assert sorted(layout(t) for t in expanded) == sorted(layout(t) for t in regular)
+
+    # An expansion keeps the collapsed indices, so its cursor resumes after the whole group
+    assert expanded[1].combination_indices == expanded[0].combination_indices
+    assert [alternatives[0] for alternatives in expanded[1].alternatives] == expanded[1].courses
+    assert expanded[1].alternatives_count == expanded[0].alternatives_count
+    cursor = service.create_cursor(expanded[1], count=2)
+    resumed = list(service.generate_schedules_progressive([course1, course2], collapse_equivalent=True,
+                                                          expand_equivalent=True, resume_cursor=cursor))
+    assert [layout(t) for t in resumed] == [layout(t) for t in expanded[4:]]
+
+    # Expansions are restored from their encodings
+    encodings = [service.encode_timetable(t) for t in expanded]
+    restored = list(service.restore_schedules([course1, course2], encodings, expanded[0].search_space.fingerprint,
+                                              collapse_equivalent=True))
+    assert [layout(t) for t in restored] == [layout(t) for t in expanded]
+
+def test_schedule_courses_are_built_lazily():
+    courses = []
+    for i in range(3):
+        courses.append(Course(
+            name=f"Course{i+1}",
+            code=f"{i+1}{i+1}{i+1}{i+1}{i+1}",
+            lectures=[Lesson(LessonTimes(8 + 3 * j, 10 + 3 * j, 1 + (i + j) % 2), "L", "A", f"{i}{j}") for j in range(3)],
+            exercises=[Lesson(LessonTimes(15 + i, 16 + i, 3), "T", "A", f"{i}9")],
+            labs=[]
+        ))
+
+    schedules = service.generate_schedules(courses)
+    assert schedules
+    assert all(t._courses is None for t in schedules)
+
+    for timetable in schedules:
+        metrics = timetable.metrics
+        assert [c.code for c in timetable.courses] == [c.code for c in courses]
+        service.timetable_metrics_service.generate_metrics(timetable)
+        assert vars(timetable.metrics) == vars(metrics)
+
+def test_schedule_metrics_from_search():
+    course1 = Course(
+        name="Course1",
+        code="11111",
+        lectures=[Lesson(LessonTimes("08:00", "10:00", "1"), "L", "A", "101")],
+        exercises=[Lesson(LessonTimes("12:00", "13:00", "1"), "T", "A", "102")],
+        labs=[Lesson(LessonTimes("15:00", "16:00", "1"), "M", "A", "103")]
+    )
+
+    course2 = Course(
+        name="Course2",
+        code="22222",
+        lectures=[Lesson(LessonTimes("10:00", "12:00", "3"), "L", "B", "201")],
+        exercises=[Lesson(LessonTimes("12:00", "14:00", "3"), "T", "B", "202")],
+        labs=[]
+    )
+
+    schedules = service.generate_schedules([course1, course2])
+    metrics = schedules[1].metrics
+    assert metrics.active_days == 2
+    assert metrics.free_windows_number == 2
+    assert metrics.free_windows_sum == 4
+    assert metrics.average_start_time == 9
+    assert metrics.average_end_time == 15
+
+def test_schedule_resume_from_cursor():
+    courses = _make_courses(3, lecture_days=3, exercise_days=4)
+
+    for ordering in ScheduleService.ORDERINGS:
+        full = [t.combination_indices for t in service.generate_schedules_progressive(courses, ordering=ordering)]
+        assert len(full) > 10
+        for stop in (0, 5, len(full) - 1):
+            first = list(service.generate_schedules_progressive(courses, limit=stop + 1, ordering=ordering))
+            cursor = service.create_cursor(first[-1], ordering, count=len(first))
+            rest = [t.combination_indices for t in service.generate_schedules_progressive(
+                courses, ordering=ordering, resume_cursor=cursor)]
+            assert rest == full[stop + 1:]
+            parallel = [t.combination_indices for t in service.generate_schedules_progressive(
+                courses, ordering=ordering, workers=2, split_depth=2, resume_cursor=cursor)]
+            assert parallel == full[stop + 1:]
+
+    # A cursor cannot be resumed on another selection
+    with pytest.raises(ValueError):
+        list(service.generate_schedules_progressive(courses[:2], resume_cursor=cursor))
+
+def test_schedule_cache_restores_timetables(tmp_path):
+    from SRC.DataBase.ScheduleCacheManager import ScheduleCacheManager
+
+    courses = _make_courses(3, lecture_days=3, exercise_days=4)
+    generated = list(service.generate_schedules_progressive(courses))
+    fingerprint = generated[0].search_space.fingerprint
+
+    cache = ScheduleCacheManager(str(tmp_path / "cache.db"), max_entries=2)
+    key = ScheduleCacheManager.make_key([c.code for c in courses], [{"day": 1, "start": 8, "end": 10}], "rev1")
+    cache.put(key, fingerprint, [service.encode_timetable(t) for t in generated], True)
+    cached = cache.get(key)
+    assert cached['complete']
+
+    restored = list(service.restore_schedules(courses, cached['entries'], cached['fingerprint']))
+    assert [t.combination_indices for t in restored] == [t.combination_indices for t in generated]
+    for original, copy in zip(generated, restored):
+        assert vars(copy.metrics) == vars(original.metrics)
+        assert [c.lectures[0].room for c in copy.courses] == [c.lectures[0].room for c in original.courses]
+
+    # The least recently used selection is evicted
+    cache.put("other1", fingerprint, [], False)
+    cache.get(key)
+    cache.put("other2", fingerprint, [], False)
+    assert cache.get("other1") is None and cache.get(key) is not None
+
+    with pytest.raises(ValueError):
+        list(service.restore_schedules(courses[:2], cached['entries'], cached['fingerprint']))
+
+def test_schedule_time_constraints_as_forbidden_mask():
+    from SRC.Services.TimeConstraintsService import TimeConstraintsService
+
+    courses = _make_courses(3, lecture_days=3, exercise_days=4)
+    constraints = [{"day": 1, "start": 8, "end": 10}, {"day": 2, "start": 14, "end": 15}]
+    forbidden_mask = TimeConstraintsService().generate_forbidden_mask(constraints)
+
+    def is_free(timetable):
+        for course in timetable.courses:
+            for lesson in course.lectures + course.exercises:
+                for c in constraints:
+                    if lesson.time.day == c["day"] and lesson.time.start_hour < c["end"] and c["start"] < lesson.time.end_hour:
+                        return False
+        return True
+
+    def layout(timetable):
+        return tuple((c.lectures[0].room, c.exercises[0].room) for c in timetable.courses)
+
+    expected = [layout(t) for t in service.generate_schedules_progressive(courses) if is_free(t)]
+    constrained = list(service.generate_schedules_progressive(courses, forbidden_mask=forbidden_mask))
+    assert 0 < len(expected) < len(list(service.generate_schedules_progressive(courses)))
+    assert [layout(t) for t in constrained] == expected
+    assert service.count_schedules(courses, forbidden_mask) == len(expected)
+    # The blocks are not part of the timetables, so they do not change the metrics
+    for timetable in constrained:
+        metrics = timetable.metrics
+        service.timetable_metrics_service.generate_metrics(timetable)
+        assert vars(timetable.metrics) == vars(metrics)
+
+    # A course that only meets in blocked slots leaves no timetables
+    assert service.count_schedules(courses, TimeConstraintsService().generate_forbidden_mask(
+        [{"day": day, "start": 8, "end": 14} for day in range(1, 4)])) == 0
+
+def test_find_conflicting_courses():
+    from SRC.Services.TimeConstraintsService import TimeConstraintsService
+
+    def make_course(code, lecture_times, exercise_time):
+        return Course(
+            name=f"Course{code}", code=code,
+            lectures=[Lesson(LessonTimes(start, start + 2, day), "L", "A", f"{code}{n}")
+                      for n, (day, start) in enumerate(lecture_times)],
+            exercises=[Lesson(LessonTimes(exercise_time[1], exercise_time[1] + 1, exercise_time[0]), "T", "A", f"{code}9")],
+            labs=[]
+        )
+
+    free = make_course("10001", [(1, 8), (2, 8)], (3, 14))
+    clash_a = make_course("10002", [(4, 8)], (5, 14))
+    clash_b = make_course("10003", [(4, 9)], (6, 14))
+    other = make_course("10004", [(1, 12), (2, 12)], (3, 16))
+
+    courses = [free, clash_a, other, clash_b]
+    assert service.find_conflicting_courses(courses) == (["10002", "10003"], False)
+    assert list(service.generate_schedules_progressive(courses)) == []
+    assert service.find_conflicting_courses([free, clash_a, other]) == ([], False)
+
+    # Both lectures of the first course are blocked on one of its days each
+    forbidden_mask = TimeConstraintsService().generate_forbidden_mask(
+        [{"day": 1, "start": 8, "end": 10}, {"day": 2, "start": 9, "end": 10}])
+    assert service.find_conflicting_courses([free, clash_a, other], forbidden_mask) == (["10001"], True)
+    assert service.count_schedules([free, clash_a, other], forbidden_mask) == 0
+
+def test_schedule_anytime_search():
+    courses = _make_courses(4, lecture_days=4, exercise_days=5)
+
+    for key in ScheduleService.METRIC_KEYS:
+        exact = service.generate_best(courses, key, k=5)
+        anytime = list(service.generate_schedules_progressive(courses, limit=5, key=key, time_budget=60))
+        assert [getattr(t.metrics, key) for t in anytime] == [getattr(t.metrics, key) for t in exact]
+
+    # The search stops as soon as the target is reached
+    best_days = service.generate_best(courses, "active_days", k=1)[0].metrics.active_days
+    reached = list(service.generate_schedules_progressive(courses, limit=3, key="active_days", target=best_days + 1))
+    assert len(reached) == 3 and all(t.metrics.active_days <= best_days + 1 for t in reached)
+
+    # No time at all - nothing is found, but nothing is waited for either
+    assert list(service.generate_schedules_progressive(courses, key="active_days", time_budget=0)) == []
+    assert list(service.generate_schedules_progressive(courses, time_budget=0)) == []
+
+    # The budget holds even while the search finds nothing: 10 courses can't share 9 lecture hours
+    crowded = [Course(name=f"Crowded{i}", code=f"{i + 1:05d}",
+                      lectures=[Lesson(LessonTimes(8 + h, 9 + h, 1), "L", "A", f"{i}{h}") for h in range(9)],
+                      exercises=[Lesson(LessonTimes(8 + h, 9 + h, 2), "T", "A", f"{i}{h}") for h in range(9)],
+                      labs=[]) for i in range(10)]
+    start = time.time()
+    assert list(service.generate_schedules_progressive(crowded, time_budget=0.2)) == []
+    assert time.time() - start < 1
+
+    with pytest.raises(ValueError):
+        list(service.generate_schedules_progressive(courses, target=3))
+
+def test_sample_schedules_uniformly():
+    courses = _make_courses(3, lecture_days=3, exercise_days=4)
+    all_schedules = {t.combination_indices for t in service.generate_schedules_progressive(courses)}
+
+    samples = [t.combination_indices for t in service.sample_schedules(courses, 200 * len(all_schedules), seed=7)]
+    assert set(samples) == all_schedules
+    frequencies = [samples.count(indices) for indices in all_schedules]
+    assert min(frequencies) > 140 and max(frequencies) < 260
+
+    # Reproducible with a seed, and nothing to draw from an impossible selection
+    assert [t.combination_indices for t in service.sample_schedules(courses, 5, seed=3)] == \
+        [t.combination_indices for t in service.sample_schedules(courses, 5, seed=3)]
+    clashes = [Course(name="Clash", code=code, lectures=[Lesson(LessonTimes(8, 10, 6), "L", "A", "1")],
+                      exercises=[Lesson(LessonTimes(10, 11, 6), "T", "A", "2")], labs=[]) for code in ("99998", "99999")]
+    assert list(service.sample_schedules(courses + clashes, 5)) == []
+
+def test_generate_pareto_front():
+    courses = _make_courses(4, lecture_days=4, exercise_days=5)
+
+    for objectives in (ScheduleService.PARETO_OBJECTIVES, (("free_windows_number", True), ("average_end_time", False))):
+        def costs(timetable):
+            return tuple(getattr(timetable.metrics, key) * (1 if ascending else -1) for key, ascending in objectives)
+
+        # Brute force: every distinct metric combination no other timetable dominates
+        points = {costs(t) for t in service.generate_schedules_progressive(courses)}
+        expected = sorted(p for p in points
+                          if not any(q != p and all(a <= b for a, b in zip(q, p)) for q in points))
+
+        front = service.generate_pareto_front(courses, objectives)
+        assert [costs(t) for t in front] == expected
+
+    with pytest.raises(ValueError):
+        service.generate_pareto_front(courses, (("credits", True),))
+
+def test_vectorized_schedule_search():
+    pytest.importorskip("numpy")
+    courses = _make_courses(4, lecture_days=4, exercise_days=5)
+
+    def describe(timetable):
+        metrics = timetable.metrics
+        return timetable.combination_indices, tuple(getattr(metrics, key) for key in ScheduleService.METRIC_KEYS)
+
+    expected = [describe(t) for t in service.generate_schedules_progressive(courses)]
+    vectorized = [describe(t) for t in service.generate_schedules_progressive(courses, vectorized=True)]
+    assert vectorized == expected and expected
+
+    # Half-hour lessons are searched in half-hour slots, with the same (not always whole) metrics
+    courses.append(Course(name="Course5", code="55555",
+                          lectures=[Lesson(LessonTimes("08:30", "10:00", d), "L", "A", f"5{d}") for d in (1, 2)],
+                          exercises=[Lesson(LessonTimes("16:30", "17:00", d), "T", "A", f"5{d + 5}") for d in (3, 4)],
+                          labs=[]))
+    expected = [describe(t) for t in service.generate_schedules_progressive(courses)]
+    vectorized = [describe(t) for t in service.generate_schedules_progressive(courses, vectorized=True)]
+    assert vectorized == expected and expected
+    assert any(isinstance(values[2], float) for _, values in expected)
+
+def test_course_combinations_cached():
+    def create_course(exercise_hour):
+        return Course(
+            name="Course1",
+            code="11111",
+            lectures=[Lesson(LessonTimes(8, 10, 1), "L", "100", "101"), Lesson(LessonTimes(10, 12, 2), "L", "100", "102")],
+            exercises=[Lesson(LessonTimes(exercise_hour, exercise_hour + 1, 3), "T", "100", "103")],
+            labs=[]
+        )
+
+    first = service._build_search_space([create_course(12)])
+    # The same catalog data in new objects reuses the cached combinations
+    again = service._build_search_space([create_course(12)])
+    assert again.combinations[0][0][2] is first.combinations[0][0][2]
+    assert again.masks == first.masks
+
+    # A changed lesson is expanded again
+    changed = service._build_search_space([create_course(14)])
+    assert changed.combinations[0][0][2] is not first.combinations[0][0][2]
+    assert changed.masks != first.masks
+    assert len(service.generate_schedules([create_course(14)])) == 2
+
+    # Searches on several threads share the cache (and keep evicting from it) safely
+    from concurrent.futures import ThreadPoolExecutor
+    cache_size = ScheduleService.COMBINATIONS_CACHE_SIZE
+    ScheduleService.COMBINATIONS_CACHE_SIZE = 4
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            counts = list(executor.map(lambda hour: len(service.generate_schedules([create_course(8 + hour % 12)])),
+                                       range(400)))
+    finally:
+        ScheduleService.COMBINATIONS_CACHE_SIZE = cache_size
+    assert counts == [len(service.generate_schedules([create_course(8 + hour % 12)])) for hour in range(400)]
+
+def test_search_space_built_once_per_selection(monkeypatch):
+    built = []
+    create_search_space = ScheduleService._create_search_space
+    monkeypatch.setattr(ScheduleService, "_create_search_space",
+                        lambda self, *args: built.append(args) or create_search_space(self, *args))
+    ScheduleService._search_space_cache.clear()
+
+    # The feasibility check, the count and the search of a selection share one search space
+    courses = _make_courses(4, 5, 5)
+    assert ScheduleService().find_conflicting_courses(courses) == ([], False)
+    total = ScheduleService().count_schedules(courses)
+    assert len(list(ScheduleService().generate_schedules_progressive(courses))) == total
+    assert len(built) == 1
+
+    # A copy of the same catalog data reuses it too, a changed selection is built again
+    ScheduleService().count_schedules(_make_courses(4, 5, 5))
+    ScheduleService().count_schedules(courses[:3])
+    assert len(built) == 2
+
+def test_get_all_options_async():
+    pytest.importorskip("pandas")
+    import asyncio
+    from contextlib import aclosing
+    from SRC.Controller.FileController import FileController
+
+    controller = FileController(".txt", use_database=False)
+    produced = []
+    closed = []
+
+    def get_all_options(file_path1, file_path2, batch_size=100, **options):
+        try:
+            for i in range(10):
+                produced.append(i)
+                yield [i] * batch_size
+        finally:
+            closed.append(True)
+    controller.get_all_options = get_all_options
+
+    async def consume(count):
+        batches = []
+        async with aclosing(controller.get_all_options_async(None, None, batch_size=2, prefetch=1)) as stream:
+            async for batch in stream:
+                batches.append(batch)
+                if len(batches) == count:
+                    break
+        return batches
+
+    assert asyncio.run(consume(None)) == [[i, i] for i in range(10)]
+    produced.clear()
+    closed.clear()
+    # Stopped early - only a bounded number of batches were searched ahead, and the search was closed
+    assert asyncio.run(consume(3)) == [[0, 0], [1, 1], [2, 2]]
+    assert len(produced) <= 5 and closed == [True]
+
+def test_timetable_worker_count_does_not_block():
+    pytest.importorskip("PyQt5")
+    import threading
+    from SRC.ViewLayer.View.TimeTableWorker import TimetableWorker
+
+    total = 64 * 10 ** 9  # More than a C int holds
+    counting = threading.Event()
+    release = threading.Event()
+    closed = []
+
+    class Controller:
+        def load_selection(self, file_path1, file_path2):
+            return ["course"]
+
+        def find_conflicting_courses(self, file_path1, file_path2, courses=None):
+            assert courses == ["course"]
+            return [], False
+
+        def get_all_options(self, file_path1, file_path2, batch_size=100, workers=None, courses=None):
+            assert courses == ["course"]
+            try:
+                for i in range(10 ** 6):
+                    yield [i] * batch_size
+            finally:
+                closed.append(True)  # Where get_all_options stores what was found in the cache
+
+        def count_options(self, file_path1, file_path2, courses=None):
+            assert courses == ["course"]
+            counting.set()
+            release.wait(5)
+            return total
+
+    def start_worker():
+        worker = TimetableWorker(Controller(), None, batch_size=2)
+        progress = []
+        worker.loading_progress.connect(lambda current, count: progress.append(count))
+        loading = threading.Thread(target=worker.run)
+        loading.start()
+        assert counting.wait(5)
+        return worker, progress, loading
+
+    def wait_until(condition):
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert condition()
+
+    # The batches keep streaming while the count runs, and a stop is honoured right away
+    worker, progress, loading = start_worker()
+    wait_until(lambda: worker.loaded_count >= 10)
+    worker.stop()
+    loading.join(2)
+    assert not loading.is_alive()
+    assert closed == [True]  # The stopped search was closed on the loading thread
+    release.set()
+    time.sleep(0.05)
+    assert set(progress) == {0} and worker.total_count == 0  # The late count is dropped
+
+    # Without a stop, the total is reported once it is counted
+    counting.clear()
+    release.clear()
+    worker, progress, loading = start_worker()
+    release.set()
+    wait_until(lambda: total in progress)
+    worker.stop()
+    loading.join(2)
+    assert worker.total_count == total
+
+def test_diverse_schedules():
+    courses = _make_courses(4, lecture_days=4, exercise_days=5)
+
+    all_schedules = list(service.generate_schedules_progressive(courses))
+    lessons_of = {t.combination_indices: [lesson for course in t.courses for lesson in (course.lectures[0], course.exercises[0])]
+                  for t in all_schedules}
+
+    def lessons(timetable):
+        return lessons_of[timetable.combination_indices]
+
+    for min_difference in (1, 2, 3, 5):
+        diverse = list(service.generate_schedules_progressive(courses, min_difference=min_difference))
+        assert diverse and diverse[0].combination_indices == all_schedules[0].combination_indices
+        for i, timetable in enumerate(diverse):
+            for other in diverse[:i]:
+                assert sum(a is not b for a, b in zip(lessons(timetable), lessons(other))) >= min_difference
+
+        # Nothing was skipped that differs enough from everything yielded
+        kept = {t.combination_indices for t in diverse}
+        for timetable in all_schedules:
+            if timetable.combination_indices not in kept:
+                assert any(sum(a is not b for a, b in zip(lessons(timetable), lessons(other))) < min_difference
+                           for other in diverse)
+    assert len(list(service.generate_schedules_progressive(courses, min_difference=1))) == len(all_schedules)
+
+def test_compute_metrics_batch():
+    from SRC.Models.TimeTable import TimeTable
+    from SRC.Services.TimetableMetricsService import TimetableMetricsService
+
+    metrics_service = TimetableMetricsService()
+    timetables = [TimeTable(list(t.courses)) for t in service.generate_schedules([
+        Course(name="Course1", code="11111",
+               lectures=[Lesson(LessonTimes("08:00", "10:00", "1"), "L", "A", "1"),
+                         Lesson(LessonTimes("12:00", "14:00", "2"), "L", "A", "2")],
+               exercises=[Lesson(LessonTimes("14:00", "15:00", "1"), "T", "A", "3"),
+                          Lesson(LessonTimes("09:00", "10:00", "2"), "T", "A", "4")],
+               labs=[]),
+        Course(name="Course2", code="22222",
+               lectures=[Lesson(LessonTimes(11, 13, 1), "L", "A", "5"), Lesson(LessonTimes(16, 18, 3), "L", "A", "6")],
+               exercises=[Lesson(LessonTimes(8, 9, 3), "T", "A", "7")],
+               labs=[])
+    ])]
+    # Overlapping lessons and a timetable without lessons
+    timetables.append(TimeTable([Course(name="Course3", code="33333",
+                                        lectures=[Lesson(LessonTimes(8, 12, 4), "L", "A", "8")],
+                                        exercises=[Lesson(LessonTimes(9, 10, 4), "T", "A", "9")],
+                                        labs=[Lesson(LessonTimes(11, 13, 4), "M", "A", "10")])]))
+    timetables.append(TimeTable([]))
+
+    batch = metrics_service.compute_metrics_batch(timetables)
+    assert len(batch) == len(timetables)
+    for timetable, metrics in zip(timetables[:-1], batch):
+        metrics_service.generate_metrics(timetable)
+        assert vars(metrics) == vars(timetable.metrics)
+    assert batch[-1].active_days == 0 and batch[-1].average_start_time == 0
+
+def test_metrics_registry():
+    from SRC.Services.MetricsRegistry import MetricsRegistry
+
+    course1 = Course(name="Course1", code="11111",
+                     lectures=[Lesson(LessonTimes(8, 10, 1), "L", "100", "101")],
+                     exercises=[Lesson(LessonTimes(10, 11, 1), "T", "200", "102")],
+                     labs=[Lesson(LessonTimes(13, 15, 1), "M", "200", "103")])
+    course2 = Course(name="Course2", code="22222",
+                     lectures=[Lesson(LessonTimes(12, 14, 2), "L", "100", "201")],
+                     exercises=[Lesson(LessonTimes(9, 10, 2), "T", "100", "202")],
+                     labs=[])
+    # The timetable with the lab of the first course
+    timetable = next(t for t in service.generate_schedules([course1, course2]) if t.courses[0].labs)
+
+    assert MetricsRegistry.get_value(timetable, "active_days") == timetable.metrics.active_days == 2
+    assert MetricsRegistry.get_value(timetable, "total_campus_hours") == 7 + 5
+    assert MetricsRegistry.get_value(timetable, "max_consecutive_hours") == 3
+    assert MetricsRegistry.get_value(timetable, "building_changes") == 1
+    assert MetricsRegistry.get_value(timetable, "earliest_start") == 8
+
+    # The lesson-based metrics of a lazy timetable leave its courses unbuilt
+    for lazy in service.generate_schedules([course1, course2]):
+        with_lab = any(lesson.time.end_hour == 15 for lesson in lazy.lessons)
+        assert MetricsRegistry.get_value(lazy, "total_campus_hours") == (7 if with_lab else 3) + 5
+        assert lazy._courses is None
+
+    # A plugged-in metric is computed once, on first use
+    calls = []
+
+    @MetricsRegistry.register("test_lessons", "Lessons")
+    def count_lessons(t):
+        calls.append(t)
+        return sum(len(c.lectures) + len(c.exercises) + len(c.labs) for c in t.courses)
+
+    try:
+        assert "test_lessons" not in timetable.metric_values
+        assert MetricsRegistry.get_value(timetable, "test_lessons") == 5
+        assert MetricsRegistry.get_value(timetable, "test_lessons") == 5
+        assert len(calls) == 1
+        assert MetricsRegistry.get_labels()["Lessons"] == "test_lessons"
+    finally:
+        MetricsRegistry._metrics.pop("test_lessons")
+
+    with pytest.raises(ValueError):
+        MetricsRegistry.get_value(timetable, "no_such_metric")
+
+def test_minute_resolution_lessons():
+    from SRC.Services.TimetableMetricsService import TimetableMetricsService
+
+    # Back-to-back half-hour lessons meet at 12:15 without overlapping
+    assert not LessonTimes("10:30", "12:15", 1).overlaps(LessonTimes("12:15", "13:00", 1))
+    assert LessonTimes("10:30", "12:15", 1).overlaps(LessonTimes("12:00", "13:00", 1))
+    assert not LessonTimes("10:30", "12:15", 1).overlaps(LessonTimes("10:30", "12:15", 2))
+
+    # A lesson ending within an hour takes that hourly slot, and minutes from the database stay exact
+    assert LessonTimes("10:30", "12:15", 1).slot_end_hour == 13
+    assert LessonTimes(10, 12, 1).slot_end_hour == 12
+    time = LessonTimes.from_minutes(630, 735, 1)
+    assert (time.start_time, time.end_time, time.day) == (630, 735, 1)
+    assert isinstance(time.end_time, int)
+
+    course1 = Course(name="Course1", code="11111",
+                     lectures=[Lesson(LessonTimes("10:30", "12:15", 1), "L", "100", "101")],
+                     exercises=[Lesson(LessonTimes("13:30", "14:15", 1), "T", "100", "102")],
+                     labs=[])
+    course2 = Course(name="Course2", code="22222",
+                     lectures=[Lesson(LessonTimes("14:15", "15:00", 1), "L", "100", "201")],
+                     exercises=[Lesson(LessonTimes("12:15", "13:00", 1), "T", "100", "202"),
+                                Lesson(LessonTimes("12:00", "13:00", 1), "T", "100", "203")],
+                     labs=[])
+    timetables = service.generate_schedules([course1, course2])
+
+    # Only the exercise that starts when the first lecture ends fits
+    assert len(timetables) == 1
+    metrics = timetables[0].metrics
+    assert metrics.active_days == 1
+    assert metrics.free_windows_number == 1
+    assert metrics.free_windows_sum == 0.5
+    assert metrics.average_start_time == 10.5
+    assert metrics.average_end_time == 15
+
+    # The metrics computed from the lessons agree with the ones of the search
+    metrics_service = TimetableMetricsService()
+    for computed in (metrics_service.compute_metrics_batch(timetables)[0],
+                     metrics_service.create_metrics(metrics_service.get_lesson_times(timetables[0]))):
+        assert vars(computed) == vars(metrics)
+
+    # Whole-hour lessons keep whole-hour metrics
+    course3 = Course(name="Course3", code="33333",
+                     lectures=[Lesson(LessonTimes(8, 10, 1), "L", "100", "301")],
+                     exercises=[Lesson(LessonTimes(12, 13, 1), "T", "100", "302")],
+                     labs=[])
+    metrics = service.generate_schedules([course3])[0].metrics
+    assert metrics.free_windows_sum == 2
+    assert isinstance(metrics.free_windows_sum, int)
+
+def test_sorted_timetables_view():
+    from SRC.ViewLayer.Logic.TimetablesSorter import TimetablesSorter
+
+    course1 = Course(name="Course1", code="11111",
+                     lectures=[Lesson(LessonTimes(h, h + 2, d), "L", "100", "101") for d in (1, 2, 3) for h in (8, 12)],
+                     exercises=[Lesson(LessonTimes(h, h + 1, d), "T", "100", "102") for d in (1, 4) for h in (10, 15)],
+                     labs=[])
+    course2 = Course(name="Course2", code="22222",
+                     lectures=[Lesson(LessonTimes(h, h + 2, d), "L", "100", "201") for d in (2, 5) for h in (9, 14)],
+                     exercises=[Lesson(LessonTimes(h, h + 1, d), "T", "100", "202") for d in (3, 5) for h in (8, 17)],
+                     labs=[])
+    timetables = service.generate_schedules([course1, course2])
+    assert len(timetables) > 20
+
+    sorter = TimetablesSorter(top_n=5)
+    for key, ascending in (("free_windows_sum", True), ("average_end_time", False)):
+        all_options = []
+        for start in range(0, len(timetables), 7):
+            # Batches arrive while the sorted view is being shown
+            all_options.extend(timetables[start:start + 7])
+            view = sorter.sort_timetables_by_key(all_options, key, ascending)
+            expected = sorted(all_options, key=lambda t: getattr(t.metrics, key), reverse=not ascending)
+            assert len(view) == len(all_options)
+            assert view[:5] == expected[:5]
+            assert view[len(view) // 2] == expected[len(expected) // 2]
+        # Paging past the top N builds the full order
+        assert list(view) == expected
+        assert sorter.get_current_sort_key(view) == (key, ascending)
+
+def test_sorted_key_list():
+    import random
+    from SRC.ViewLayer.Logic.TimetablesSorter import SortedKeyList
+
+    rng = random.Random(7)
+    pairs = [((rng.randint(0, 20), i), f"item{i}") for i in range(30)]
+    sorted_list = SortedKeyList(pairs, load=4)
+    for i in range(30, 300):
+        # Small sublists, so adding splits them many times
+        pair = ((rng.randint(0, 20), i), f"item{i}")
+        pairs.append(pair)
+        sorted_list.add(*pair)
+        if i % 37 == 0:
+            expected = [item for _, item in sorted(pairs)]
+            assert [sorted_list[index] for index in range(len(sorted_list))] == expected
+
+    expected = [item for _, item in sorted(pairs)]
+    assert len(sorted_list) == 300
+    assert list(sorted_list) == expected
+    assert sorted_list[-1] == expected[-1]
+    with pytest.raises(IndexError):
+        sorted_list[300]